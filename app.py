@@ -1,11 +1,38 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify 
-import mysql.connector
+from flask import Flask, Response, g, render_template, request, redirect, url_for, session, jsonify 
+from flask import before_render_template, template_rendered
 from dotenv import load_dotenv
 import os 
 from mysql.connector import Error
 from flask_moment import Moment
+import click
+import hmac
 import logging
-from chart import generate_summary_chart
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from chart_service import ChartRenderer, chart_columns, chart_key
+from cache import ByteLRUCache, DataVersions, SQLiteCache, TieredCache, TTLCache, cache_key
+from db import ConnectionPool
+from partitions import SCAN_MONTHS, TableRegistry
+from versions import bump_load_version, read_load_version
+from trend import TREND_METRICS, build_matrix, group_columns, partial_query
+from rollup import CHART_METRICS, ROLLUP_SELECT, ROLLUP_TABLE, SUMMARY_METRICS, RollupManager
+from hierarchy import HierarchyTree, KeyedLocks, hierarchy_query
+from search import ACCOUNTS_QUERY, build_search_index
+from query import GROUP_BY_COLUMNS, filter_where, group_by_column
+from schema import REPORTS_TABLE, advise, column_types, ensure_indexes
+from limits import ConcurrencyLimiter, parse_limits
+from metrics import MetricsRegistry, query_name
+from profiles import (COLUMN_PROFILES, REPORT_COLUMNS, ColumnPreferences,
+                      resolve_columns, select_list)
+from warmup import Warmer
+from jobs import LocalJobQueue
+from artifacts import ColumnarReader, ColumnarWriter
+from formatting import CURRENCY, DECIMAL, NUMBER, format_rows, format_value
+from export import EXPORT_FORMATS, format_available, iter_csv, iter_file_export, write_parquet, write_xlsx
+from pagination import (PageBoundaryIndex, decode_cursor, encode_cursor,
+                        filter_key, seek_clause, seek_params)
 
 
 app = Flask(__name__)
@@ -23,15 +50,336 @@ db_config = {
     'database': os.getenv('DB_NAME')
 }
 
+# Latency histograms per route, span and query, served at /metrics
+metrics = MetricsRegistry()
+metrics.histogram('request_duration_seconds', 'Request latency by route')
+metrics.histogram('span_duration_seconds', 'Time spent in named sections of a request')
+metrics.histogram('query_duration_seconds', 'Database query latency by query name and phase')
+
+# Queries slower than this many seconds are logged (0 disables); optionally with their parameters
+SLOW_QUERY_SECONDS = float(os.getenv('SLOW_QUERY_SECONDS', 0))
+SLOW_QUERY_LOG_PARAMS = os.getenv('SLOW_QUERY_LOG_PARAMS', '0') == '1'
+
+def observe_query(name, phase, seconds, sql, params):
+    name = name or (query_name(sql) if sql else 'unknown')
+    metrics.observe('query_duration_seconds',
+                    (('route', metrics.current_route()), ('query', name), ('phase', phase)), seconds)
+    if SLOW_QUERY_SECONDS and seconds >= SLOW_QUERY_SECONDS:
+        detail = f" params={list(params) if params else []}" if SLOW_QUERY_LOG_PARAMS else ""
+        app.logger.warning(f"Slow query {name} ({phase}) took {seconds:.3f}s on "
+                           f"{metrics.current_route()}: {' '.join((sql or '').split())}{detail}")
+
+# Shared connection pool used by every route
+db_pool = ConnectionPool(
+    db_config,
+    size=int(os.getenv('DB_POOL_SIZE', 10)),
+    timeout=float(os.getenv('DB_POOL_TIMEOUT', 5)),
+    validate_after=float(os.getenv('DB_POOL_VALIDATE_AFTER', 30)),
+    statement_cache_size=int(os.getenv('DB_STATEMENT_CACHE_SIZE', 32)),
+    query_observer=observe_query,
+)
+
 def get_db_connection():
+    # conn.close() in the routes hands the connection back to the pool
     try:
-        connection = mysql.connector.connect(**db_config)
-        if connection.is_connected():
-            return connection
+        with metrics.span('db_connect'):
+            return db_pool.get_connection()
     except Error as e:
         app.logger.error(f"Database connection error: {e}")
         return None
 
+# Monthly ngrlng_sale_YYYYMM tables, discovered on first use and on /refresh_month
+table_registry = TableRegistry(get_db_connection, max_workers=int(os.getenv('PARTITION_WORKERS', 4)),
+                               logger=app.logger)
+
+def sales_table_for(billing_month):
+    """
+    Sales table for a billing month. Raises Error when table discovery fails,
+    rather than quietly answering from another month's table. A cold registry
+    borrows its own connections, so resolve the table before taking one.
+    """
+    return table_registry.table_for(billing_month)
+
+# Keyset pagination for report_results: rows are ordered by (s.AREA, s.<SALE_ROW_KEY>)
+REPORT_PAGINATION = os.getenv('REPORT_PAGINATION', 'offset')
+SALE_ROW_KEY = os.getenv('SALE_ROW_KEY', 'id')
+if not SALE_ROW_KEY.isidentifier():
+    raise ValueError(f"Invalid SALE_ROW_KEY column name: {SALE_ROW_KEY!r}")
+
+page_index = PageBoundaryIndex()
+
+# report_results totals are cached per filter set and sales-table load version.
+# 'estimate' mode answers wide (no geographic filter) reports from index
+# statistics and refines the exact count in the background.
+REPORT_COUNT_MODE = os.getenv('REPORT_COUNT_MODE', 'exact')
+COUNT_ESTIMATE_MIN_ROWS = int(os.getenv('COUNT_ESTIMATE_MIN_ROWS', 100000))
+
+count_cache = TTLCache(maxsize=512, ttl=float(os.getenv('COUNT_CACHE_TTL', 3600)))
+# Sales table load versions (versions.py) are read from MySQL at most every
+# DATA_VERSION_TTL seconds, so other workers see a /refresh_month within that time
+data_versions = DataVersions(ttl=float(os.getenv('DATA_VERSION_TTL', 30)))
+# Dropdown hierarchy trees per (billing month, customer class)
+hierarchy_cache = TTLCache(maxsize=64, ttl=float(os.getenv('HIERARCHY_CACHE_TTL', 6 * 3600)))
+hierarchy_build_lock = KeyedLocks()
+
+# Report pages and summaries: in-process LRU bounded by bytes, plus an optional
+# SQLite file shared by the workers on this host. Entries are tagged with their sales table.
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', 3600))
+result_cache = TieredCache(
+    ByteLRUCache(max_bytes=int(os.getenv('RESULT_CACHE_BYTES', 64 * 1024 * 1024)), ttl=RESULT_CACHE_TTL),
+    SQLiteCache(os.getenv('RESULT_CACHE_PATH'), ttl=RESULT_CACHE_TTL) if os.getenv('RESULT_CACHE_PATH') else None,
+    logger=app.logger,
+)
+
+# report_results shows every column unless the user picks a narrower profile (or a
+# custom set), remembered per user in a small SQLite file
+REPORT_COLUMN_PROFILE = os.getenv('REPORT_COLUMN_PROFILE', 'full')
+try:
+    column_prefs = ColumnPreferences(os.getenv('COLUMN_PREFS_PATH')
+                                     or os.path.join(app.instance_path, 'column_preferences.sqlite3'))
+except (OSError, sqlite3.Error) as e:
+    app.logger.warning(f"Column preferences unavailable, keeping them in the session only: {e}")
+    column_prefs = None
+
+# Very large reports can run as background jobs that write a columnar file per job;
+# the results page and downloads then read the file instead of MySQL
+try:
+    report_jobs = LocalJobQueue(os.getenv('REPORT_JOBS_DIR') or os.path.join(app.instance_path, 'report_jobs'),
+                                workers=int(os.getenv('REPORT_JOB_WORKERS', 2)),
+                                ttl=float(os.getenv('REPORT_JOB_TTL', 24 * 3600)), logger=app.logger)
+except OSError as e:
+    app.logger.warning(f"Report job directory unavailable, background reports disabled: {e}")
+    report_jobs = None
+
+# Per-month search indexes for the report's full-result search
+search_cache = TTLCache(maxsize=16, ttl=float(os.getenv('SEARCH_INDEX_TTL', 6 * 3600)))
+search_build_lock = KeyedLocks()
+
+# Area-level monthly rollups for summary_report and chart_view
+rollups = RollupManager(enabled=os.getenv('USE_ROLLUPS', '1') == '1', logger=app.logger)
+
+# 'client' draws charts in the browser from /chart_data; 'server' serves matplotlib PNGs
+CHART_RENDERING = os.getenv('CHART_RENDERING', 'client')
+
+# Chart PNGs are rendered on a process pool and cached by filters/options/data version
+chart_renderer = ChartRenderer(processes=int(os.getenv('CHART_RENDER_PROCESSES', 2)),
+                               ttl=float(os.getenv('CHART_CACHE_TTL', 3600)), logger=app.logger)
+
+# Optionally warm the chart imports in the background once the worker is up
+if os.getenv('CHART_PRELOAD', '1' if CHART_RENDERING == 'server' else '0') == '1':
+    chart_preload_timer = threading.Timer(float(os.getenv('CHART_PRELOAD_DELAY', 5)), chart_renderer.warm)
+    chart_preload_timer.daemon = True
+    chart_preload_timer.start()
+
+count_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='count-refine')
+_refining_counts = set()
+_refining_lock = threading.Lock()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.set_route(request.endpoint or 'unknown')
+
+@app.after_request
+def record_request_time(response):
+    started = g.get('request_started')
+    if started is not None:
+        metrics.observe('request_duration_seconds',
+                        (('route', request.endpoint or 'unknown'), ('method', request.method),
+                         ('status', response.status_code)),
+                        time.perf_counter() - started)
+    return response
+
+@app.teardown_request
+def clear_request_route(exc=None):
+    metrics.set_route(None)
+
+def _template_started(sender, template, context, **extra):
+    g.template_started = time.perf_counter()
+
+def _template_finished(sender, template, context, **extra):
+    started = g.pop('template_started', None)
+    if started is not None:
+        metrics.observe('span_duration_seconds',
+                        (('route', metrics.current_route()), ('span', f"render:{template.name}")),
+                        time.perf_counter() - started)
+
+before_render_template.connect(_template_started, app)
+template_rendered.connect(_template_finished, app)
+
+# Route groups with a cap on concurrent requests; unlisted routes (login, dropdowns) are never limited
+ROUTE_GROUPS = {
+    'summary_report': 'heavy',
+    'trend_report': 'heavy',
+    'chart_view': 'heavy',
+    'chart_data_api': 'heavy',
+    'chart_image': 'heavy',
+    'export_report': 'export',
+    'download_report_job': 'export',
+    'report_results': 'report',
+}
+route_limiter = ConcurrencyLimiter(
+    parse_limits(os.getenv('ROUTE_LIMITS'), {'heavy': 4, 'export': 2, 'report': 8}),
+    timeout=float(os.getenv('ROUTE_LIMIT_TIMEOUT', 0)),
+)
+
+@app.before_request
+def limit_route_concurrency():
+    group = ROUTE_GROUPS.get(request.endpoint)
+    if group is None:
+        return None
+    if not route_limiter.acquire(group):
+        app.logger.warning(f"Rejected {request.endpoint}: too many concurrent '{group}' requests")
+        response = jsonify({'error': 'Server busy, please retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    g.route_group = group
+    return None
+
+@app.teardown_request
+def release_route_slot(exc=None):
+    group = g.pop('route_group', None)
+    if group is not None:
+        route_limiter.release(group)
+
+# Operational endpoints are for signed-in users, or for scrapers sending STATS_TOKEN as a
+# bearer token. Address allow-listing is opt-in: behind a same-host reverse proxy every
+# request comes from 127.0.0.1, so listing loopback there would open the endpoints to all.
+STATS_TOKEN = os.getenv('STATS_TOKEN')
+STATS_ALLOWED_ADDRS = {addr.strip() for addr in os.getenv('STATS_ALLOWED_ADDRS', '').split(',')
+                       if addr.strip()}
+
+def stats_allowed():
+    if "username" in session:
+        return True
+    if STATS_TOKEN:
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(token.strip(), STATS_TOKEN):
+            return True
+    return request.remote_addr in STATS_ALLOWED_ADDRS
+
+@app.route('/route_limits')
+def route_limits():
+    if not stats_allowed():
+        return jsonify({'error': 'Not authenticated'}), 401
+    return jsonify(route_limiter.stats())
+
+def collect_runtime_metrics():
+    pool = db_pool.stats()
+    statements = pool['statements']
+    results = result_cache.stats()
+    return [
+        ('db_pool_connections', 'gauge', 'Pooled connections by state',
+         [((('state', 'in_use'),), pool['in_use']), ((('state', 'idle'),), pool['idle'])]),
+        ('db_pool_waits_total', 'counter', 'Borrowers that had to wait for a connection', [((), pool['waits'])]),
+        ('db_pool_timeouts_total', 'counter', 'Borrowers that gave up waiting', [((), pool['timeouts'])]),
+        ('prepared_statement_lookups_total', 'counter', 'Prepared statement cache lookups',
+         [((('result', 'hit'),), statements['hits']), ((('result', 'miss'),), statements['misses'])]),
+        ('result_cache_lookups_total', 'counter', 'Result cache lookups by tier',
+         [((('result', 'memory_hit'),), results['memory_hits']),
+          ((('result', 'shared_hit'),), results['shared_hits']),
+          ((('result', 'miss'),), results['misses'])]),
+        ('route_limit_rejections_total', 'counter', 'Requests refused by a route concurrency limit',
+         [((('group', group),), data['rejected']) for group, data in route_limiter.stats().items()]),
+    ]
+
+metrics.add_collector(collect_runtime_metrics)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not stats_allowed():
+        return jsonify({'error': 'Not authenticated'}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/pool_stats')
+def pool_stats():
+    if not stats_allowed():
+        return jsonify({'error': 'Not authenticated'}), 401
+    return jsonify(db_pool.stats())
+
+@app.route('/cache_stats')
+def cache_stats():
+    if "username" not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    return jsonify({
+        'results': result_cache.stats(),
+        'counts': count_cache.stats(),
+        'hierarchy': hierarchy_cache.stats(),
+        'search': search_cache.stats(),
+        'charts': chart_renderer.cache.stats(),
+        'report_jobs': report_jobs.stats() if report_jobs else None,
+    })
+
+def table_version(cursor, table):
+    # Shared load counter bumped by /refresh_month, plus UPDATE_TIME for unannounced loads
+    return data_versions.get(table, lambda: read_load_version(cursor, table))
+
+WARMUP_ON_REFRESH = os.getenv('WARMUP_ON_REFRESH', '1') == '1'
+
+@app.route('/refresh_month', methods=['POST'])
+def refresh_month():
+    """
+    Called after a billing month has been (re)loaded to drop cached totals, page boundaries
+    dropdown hierarchies, search indexes and cached results, and to have its rollup rebuilt in the background.
+    The month's common views are then re-warmed in the background.
+
+    The reload is also recorded in the shared load-version table, which every
+    worker's cache keys and the rollup status follow, so the other workers and
+    the shared result cache move to the new data too.
+    """
+    if "username" not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    billing_month = request.form.get('billing_month') or request.args.get('billing_month')
+    try:
+        if billing_month:
+            table_registry.refresh_month(billing_month)
+        else:
+            table_registry.refresh()
+    except Error as e:
+        app.logger.error(f"Sales table discovery failed: {e}")
+        return jsonify({'error': f'Sales table discovery failed: {e}'}), 503
+    tables = [sales_table_for(billing_month)] if billing_month else table_registry.tables()
+    shared = True
+    conn = get_db_connection()
+    try:
+        if not conn:
+            raise Error("Database connection failed")
+        bump_load_version(conn, tables)
+    except Error as e:
+        app.logger.error(f"Could not record the reload of {', '.join(tables)}; "
+                         f"other workers keep their caches until the table's UPDATE_TIME moves: {e}")
+        shared = False
+    finally:
+        if conn:
+            conn.close()
+    for table in tables:
+        data_versions.invalidate(table)
+    if billing_month:
+        result_cache.invalidate_tag(tables[0])
+    else:
+        result_cache.clear()
+    if billing_month:
+        dropped = count_cache.invalidate(lambda key: ('billing_month', billing_month) in key[1])
+    else:
+        dropped = len(count_cache)
+        count_cache.clear()
+    page_index.clear()
+    rollups.invalidate(billing_month)
+    if billing_month:
+        hierarchy_cache.invalidate(lambda key: key[0] == billing_month)
+        search_cache.invalidate(lambda key: key[0] == billing_month)
+    else:
+        hierarchy_cache.clear()
+        search_cache.clear()
+    app.logger.info(f"Invalidated {dropped} cached counts for billing month {billing_month or 'ALL'}")
+    warmup = None
+    if billing_month and WARMUP_ON_REFRESH:
+        warmup = warmer.schedule(billing_month)['state']
+    return jsonify({'billing_month': billing_month, 'invalidated_counts': dropped, 'warmup': warmup,
+                    'shared': shared})
+
 @app.route('/')
 def index():
     return redirect(url_for("login"))
@@ -69,351 +417,136 @@ def clear_session():
     session.clear()
     return redirect(url_for("login"))
 
-# FIXED: Add error handling and logging to billing months endpoint
+# Billing months and customer classes come from the table registry, no per-request schema probe
 @app.route('/get_billing_months')
 def get_billing_months():
     if "username" not in session:
         return jsonify({'error': 'Not authenticated'}), 401
-    
-    conn = get_db_connection()
-    if not conn:
-        app.logger.error("Failed to connect to database for billing months")
-        return jsonify({'error': 'Database connection failed'}), 500
-    
+
     try:
-        cursor = conn.cursor(dictionary=True)
-        
-        # FIXED: Test if the table exists first
-        cursor.execute("SHOW TABLES LIKE 'ngrlng_sale_202506'")
-        if not cursor.fetchone():
-            app.logger.error("Table ngrlng_sale_202506 does not exist")
-            return jsonify({'error': 'Table ngrlng_sale_202506 not found'}), 500
-        
-        # FIXED: More robust query with better error handling
-        cursor.execute("""
-            SELECT DISTINCT Billing_Month 
-            FROM ngrlng_sale_202506
-            WHERE Billing_Month IS NOT NULL AND Billing_Month != ''
-            ORDER BY Billing_Month DESC
-            LIMIT 100
-        """)
-        
-        results = cursor.fetchall()
-        app.logger.info(f"Found {len(results)} billing months")
-        
-        if not results:
-            # FIXED: If no billing months found, return a helpful message
-            return jsonify([{'Billing_Month': 'No billing months available'}])
-        
-        return jsonify(results)
-        
+        months = table_registry.billing_months()[:100]
     except Error as e:
         app.logger.error(f"Database error in get_billing_months: {e}")
         return jsonify({'error': f'Database error: {str(e)}'}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
-# FIXED: Add error handling and logging to customer classes endpoint
+    app.logger.info(f"Found {len(months)} billing months")
+    if not months:
+        return jsonify([{'Billing_Month': 'No billing months available'}])
+    return jsonify([{'Billing_Month': month} for month in months])
+
 @app.route('/get_cust_classes')
 def get_cust_classes():
     if "username" not in session:
         return jsonify({'error': 'Not authenticated'}), 401
-    
-    conn = get_db_connection()
-    if not conn:
-        app.logger.error("Failed to connect to database for customer classes")
-        return jsonify({'error': 'Database connection failed'}), 500
-    
+
     try:
-        cursor = conn.cursor(dictionary=True)
-        
-        # FIXED: Test if the table exists first
-        cursor.execute("SHOW TABLES LIKE 'ngrlng_sale_202506'")
-        if not cursor.fetchone():
-            app.logger.error("Table ngrlng_sale_202506 does not exist")
-            return jsonify({'error': 'Table ngrlng_sale_202506 not found'}), 500
-        
-        cursor.execute("""
-            SELECT DISTINCT Cust_Cl_Cd 
-            FROM ngrlng_sale_202506
-            WHERE Cust_Cl_Cd IS NOT NULL AND Cust_Cl_Cd != ''
-            ORDER BY Cust_Cl_Cd
-            LIMIT 100
-        """)
-        
-        results = cursor.fetchall()
-        app.logger.info(f"Found {len(results)} customer classes")
-        
-        if not results:
-            return jsonify([{'Cust_Cl_Cd': 'No customer classes available'}])
-        
-        return jsonify(results)
-        
+        classes = table_registry.cust_classes(request.args.get('billing_month'))[:100]
     except Error as e:
         app.logger.error(f"Database error in get_cust_classes: {e}")
         return jsonify({'error': f'Database error: {str(e)}'}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-
-# FIXED: Improved units endpoint with better error handling
-@app.route('/get_units')
-def get_units():
-    if "username" not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-
-    billing_month = request.args.get('billing_month')
-    cust_cl_cd = request.args.get('cust_cl_cd')
-
-    if not billing_month:
-        return jsonify([])
-
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
 
-    try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT DISTINCT r.Unit_Cd, r.Unit_Descr 
-            FROM ssgc_reports r
-            INNER JOIN ngrlng_sale_202506 s ON r.Area_Cd = s.AREA
-            WHERE s.Billing_Month = %s
-        """
-        params = [billing_month]
-
-        if cust_cl_cd:
-            query += " AND s.Cust_Cl_Cd = %s"
-            params.append(cust_cl_cd)
-
-        query += """
-            AND r.Unit_Cd IS NOT NULL AND r.Unit_Descr IS NOT NULL
-            AND r.Unit_Cd != '' AND r.Unit_Descr != ''
-            ORDER BY r.Unit_Descr
-            LIMIT 100
-        """
-
-        cursor.execute(query, tuple(params))
-        units = cursor.fetchall()
-        return jsonify(units)
+    app.logger.info(f"Found {len(classes)} customer classes")
+    if not classes:
+        return jsonify([{'Cust_Cl_Cd': 'No customer classes available'}])
+    return jsonify([{'Cust_Cl_Cd': cust_cl_cd} for cust_cl_cd in classes])
 
-    except Error as e:
-        app.logger.error(f"Database error in get_units: {e}")
-        return jsonify({'error': str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
+def get_hierarchy(billing_month, cust_cl_cd=None):
+    """
+    Cached Unit..Area tree for a billing month / customer class, built on first use.
+    """
+    key = (billing_month, cust_cl_cd or None)
+    tree = hierarchy_cache.get(key)
+    if tree is not None:
+        return tree
+
+    with hierarchy_build_lock(key):
+        tree = hierarchy_cache.get(key)
+        if tree is not None:
+            return tree
+
+        table = sales_table_for(billing_month)
+        conn = get_db_connection()
+        if not conn:
+            raise Error("Database connection failed")
+        try:
+            params = [billing_month] + ([cust_cl_cd] if cust_cl_cd else [])
+            tree = HierarchyTree(conn.query(hierarchy_query(cust_cl_cd, table), params, name='hierarchy'))
+        finally:
             conn.close()
 
+        hierarchy_cache.set(key, tree)
+        return tree
 
-@app.route('/get_regions')
-def get_regions():
+def hierarchy_level(depth, parent_arg=None):
+    """
+    Shared body of the cascading dropdown endpoints: a lookup in the cached tree.
+    """
     if "username" not in session:
         return jsonify({'error': 'Not authenticated'}), 401
 
-    unit_cd = request.args.get('unit')
+    parent = request.args.get(parent_arg) if parent_arg else None
     billing_month = request.args.get('billing_month')
     cust_cl_cd = request.args.get('cust_cl_cd')
 
-    if not unit_cd or not billing_month:
+    if not billing_month or (parent_arg and not parent):
         return jsonify([])
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
     try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT DISTINCT r.Region_Cd, r.Region_Descr 
-            FROM ssgc_reports r
-            INNER JOIN ngrlng_sale_202506 s ON r.Area_Cd = s.AREA
-            WHERE r.Unit_Cd = %s AND s.Billing_Month = %s
-        """
-        params = [unit_cd, billing_month]
-
-        if cust_cl_cd:
-            query += " AND s.Cust_Cl_Cd = %s"
-            params.append(cust_cl_cd)
-
-        query += """
-            AND r.Region_Cd IS NOT NULL AND r.Region_Descr IS NOT NULL
-            AND r.Region_Cd != '' AND r.Region_Descr != ''
-            ORDER BY r.Region_Descr
-            LIMIT 100
-        """
-
-        cursor.execute(query, tuple(params))
-        regions = cursor.fetchall()
-        return jsonify(regions)
-
+        tree = get_hierarchy(billing_month, cust_cl_cd)
     except Error as e:
-        app.logger.error(f"Database error in get_regions: {e}")
+        app.logger.error(f"Database error loading hierarchy for level {depth}: {e}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
+    return jsonify(tree.children(depth, parent))
 
-@app.route('/get_zones')
-def get_zones():
+@app.route('/get_hierarchy')
+def get_hierarchy_tree():
+    """
+    Whole Unit..Area tree for a billing month / customer class in one ETag-tagged response,
+    so the report form can fill every dropdown client-side.
+    """
     if "username" not in session:
         return jsonify({'error': 'Not authenticated'}), 401
 
-    region_cd = request.args.get('region')
     billing_month = request.args.get('billing_month')
     cust_cl_cd = request.args.get('cust_cl_cd')
-
-    if not region_cd or not billing_month:
-        return jsonify([])
-
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
+    if not billing_month:
+        return jsonify({'levels': []})
 
     try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT DISTINCT r.Zone_Cd, r.Zone_Descr 
-            FROM ssgc_reports r
-            INNER JOIN ngrlng_sale_202506 s ON r.Area_Cd = s.AREA
-            WHERE r.Region_Cd = %s AND s.Billing_Month = %s
-        """
-        params = [region_cd, billing_month]
-
-        if cust_cl_cd:
-            query += " AND s.Cust_Cl_Cd = %s"
-            params.append(cust_cl_cd)
-
-        query += """
-            AND r.Zone_Cd IS NOT NULL AND r.Zone_Descr IS NOT NULL
-            AND r.Zone_Cd != '' AND r.Zone_Descr != ''
-            ORDER BY r.Zone_Descr
-            LIMIT 100
-        """
-
-        cursor.execute(query, tuple(params))
-        zones = cursor.fetchall()
-        return jsonify(zones)
-
+        tree = get_hierarchy(billing_month, cust_cl_cd)
     except Error as e:
-        app.logger.error(f"Database error in get_zones: {e}")
+        app.logger.error(f"Database error in get_hierarchy: {e}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
 
+    response = jsonify(tree.compact)
+    response.set_etag(tree.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
-@app.route('/get_subzones')
-def get_subzones():
-    if "username" not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
+@app.route('/get_units')
+def get_units():
+    return hierarchy_level(0)
 
-    zone_cd = request.args.get('zone')
-    billing_month = request.args.get('billing_month')
-    cust_cl_cd = request.args.get('cust_cl_cd')
 
-    if not zone_cd or not billing_month:
-        return jsonify([])
+@app.route('/get_regions')
+def get_regions():
+    return hierarchy_level(1, 'unit')
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
 
-    try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT DISTINCT r.SubZone_Cd, r.SubZone_Descr 
-            FROM ssgc_reports r
-            INNER JOIN ngrlng_sale_202506 s ON r.Area_Cd = s.AREA
-            WHERE r.Zone_Cd = %s AND s.Billing_Month = %s
-        """
-        params = [zone_cd, billing_month]
-
-        if cust_cl_cd:
-            query += " AND s.Cust_Cl_Cd = %s"
-            params.append(cust_cl_cd)
-
-        query += """
-            AND r.SubZone_Cd IS NOT NULL AND r.SubZone_Descr IS NOT NULL
-            AND r.SubZone_Cd != '' AND r.SubZone_Descr != ''
-            ORDER BY r.SubZone_Descr
-            LIMIT 100
-        """
-
-        cursor.execute(query, tuple(params))
-        subzones = cursor.fetchall()
-        return jsonify(subzones)
+@app.route('/get_zones')
+def get_zones():
+    return hierarchy_level(2, 'region')
 
-    except Error as e:
-        app.logger.error(f"Database error in get_subzones: {e}")
-        return jsonify({'error': str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+
+@app.route('/get_subzones')
+def get_subzones():
+    return hierarchy_level(3, 'zone')
 
 
 @app.route('/get_areas')
 def get_areas():
-    if "username" not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-
-    subzone_cd = request.args.get('subzone')
-    billing_month = request.args.get('billing_month')
-    cust_cl_cd = request.args.get('cust_cl_cd')
-
-    if not subzone_cd or not billing_month:
-        return jsonify([])
-
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'error': 'Database connection failed'}), 500
-
-    try:
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT DISTINCT r.Area_Cd, r.Area_Descr 
-            FROM ssgc_reports r
-            INNER JOIN ngrlng_sale_202506 s ON r.Area_Cd = s.AREA
-            WHERE r.SubZone_Cd = %s AND s.Billing_Month = %s
-        """
-        params = [subzone_cd, billing_month]
-
-        if cust_cl_cd:
-            query += " AND s.Cust_Cl_Cd = %s"
-            params.append(cust_cl_cd)
-
-        query += """
-            AND r.Area_Cd IS NOT NULL AND r.Area_Descr IS NOT NULL
-            AND r.Area_Cd != '' AND r.Area_Descr != ''
-            ORDER BY r.Area_Descr
-            LIMIT 100
-        """
-
-        cursor.execute(query, tuple(params))
-        areas = cursor.fetchall()
-        return jsonify(areas)
-
-    except Error as e:
-        app.logger.error(f"Database error in get_areas: {e}")
-        return jsonify({'error': str(e)}), 500
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
+    return hierarchy_level(4, 'subzone')
 
 # FIXED: Improved generate_report with better validation
 @app.route('/generate_report', methods=['POST'])
@@ -450,6 +583,228 @@ def generate_report():
     per_page = request.form.get('per_page') or request.args.get('per_page') or 50
     return redirect(url_for('report_results', page=1, per_page=per_page))
 
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 5000))
+
+def report_projection(username):
+    """
+    (profile, columns) for the detailed report. A ?profile= or ?columns= choice
+    is saved for the user; otherwise their saved choice (or the default) is used.
+    """
+    requested = [c for value in request.args.getlist('columns') for c in value.split(',') if c]
+    if request.args.get('profile') or requested:
+        profile, columns = resolve_columns(request.args.get('profile'), requested, default=REPORT_COLUMN_PROFILE)
+        names = [name for name, _, _ in columns]
+        session['report_columns'] = [profile, names]
+        if column_prefs is not None:
+            try:
+                column_prefs.set(username, profile, names)
+            except sqlite3.Error as e:
+                app.logger.warning(f"Could not save column preferences for {username}: {e}")
+        return profile, columns
+
+    saved = session.get('report_columns')
+    if saved is None and column_prefs is not None:
+        try:
+            saved = column_prefs.get(username)
+        except sqlite3.Error as e:
+            app.logger.warning(f"Could not load column preferences for {username}: {e}")
+        if saved is not None:
+            session['report_columns'] = list(saved)
+    if saved:
+        return resolve_columns(saved[0], saved[1] if saved[0] == 'custom' else None, default=REPORT_COLUMN_PROFILE)
+    return resolve_columns(REPORT_COLUMN_PROFILE, default=REPORT_COLUMN_PROFILE)
+
+def report_where(filters):
+    """
+    WHERE clause and parameters for the detailed report filters in the session.
+    """
+    return filter_where(filters, sale='s')
+
+def get_search_index(cursor, billing_month):
+    """
+    Cached search index for a billing month, rebuilt when the sales table changes.
+    """
+    table = sales_table_for(billing_month)
+    key = (billing_month, table_version(cursor, table))
+    index = search_cache.get(key)
+    if index is not None:
+        return index
+
+    with search_build_lock(key):
+        index = search_cache.get(key)
+        if index is None:
+            index = build_search_index(cursor, table, billing_month, table_registry.cust_classes(billing_month))
+            search_cache.set(key, index)
+            app.logger.info(f"Built search index for {billing_month} with {len(index)} terms")
+        return index
+
+def report_search(cursor, filters, query):
+    """
+    Extra WHERE clause and params restricting the report to rows matching `query`.
+    """
+    if not query:
+        return '', []
+    return get_search_index(cursor, filters.get('billing_month')).where(query)
+
+def report_page_select(columns, sales_table, seek=False):
+    """
+    SELECT and FROM of a report page: `columns`, led by the two seek key columns
+    when `seek` is set (keyset mode only, since it needs SALE_ROW_KEY).
+    The caller appends the WHERE clause, ordering and LIMIT.
+    """
+    seek_columns = f"""s.AREA AS _seek_area,
+        s.{SALE_ROW_KEY} AS _seek_key,
+        """ if seek else ''
+    return f"""
+    SELECT 
+        {seek_columns}{select_list(columns)}
+    FROM ssgc_reports r
+    INNER JOIN {sales_table} s ON r.Area_Cd = s.AREA
+    """
+
+def report_count_query(sales_table, base_where):
+    return f"""
+    SELECT COUNT(*) as total
+    FROM ssgc_reports r
+    INNER JOIN {sales_table} s ON r.Area_Cd = s.AREA
+    {base_where}
+    """
+
+KEYSET_ORDER = f"s.AREA, s.{SALE_ROW_KEY}"
+KEYSET_ORDER_DESC = f"s.AREA DESC, s.{SALE_ROW_KEY} DESC"
+
+def fetch_keyset_page(cursor, select_sql, base_where, params, fkey, page, per_page, token, table):
+    """
+    Fetch one report page by seeking past a (area, sale key) boundary instead of OFFSET.
+
+    The boundary comes from the opaque cursor in the next/prev links, or for a
+    plain page number from the sparse page index, skipping forward over the
+    key columns only from the nearest page we already know about.
+    `cursor` returns tuples and `select_sql` starts with the two seek key columns.
+    Returns (rows, page, next_cursor, prev_cursor).
+    """
+    order_asc, order_desc = KEYSET_ORDER, KEYSET_ORDER_DESC
+    seek = lambda direction: seek_clause(direction, 's.AREA', f"s.{SALE_ROW_KEY}")
+
+    decoded = decode_cursor(token)
+    if decoded:
+        seek_key, direction = decoded
+    else:
+        direction = 'next'
+        known_page, seek_key = page_index.nearest(fkey, per_page, page)
+        if known_page < page:
+            skip_query = f"""
+            SELECT s.AREA AS _seek_area, s.{SALE_ROW_KEY} AS _seek_key
+            FROM ssgc_reports r
+            INNER JOIN {table} s ON r.Area_Cd = s.AREA
+            {base_where}{seek('next') if seek_key else ''}
+            ORDER BY {order_asc}
+            LIMIT 1 OFFSET %s
+            """
+            skip_params = params + (seek_params(seek_key) if seek_key else [])
+            cursor.execute(skip_query, tuple(skip_params + [(page - known_page) * per_page - 1]))
+            row = cursor.fetchone()
+            if row:
+                seek_key = (row[0], row[1])
+                page_index.record(fkey, per_page, page, seek_key)
+            else:
+                # Past the end of the result: stay on the last page we know about
+                page = known_page
+
+    query = select_sql + base_where
+    query_params = list(params)
+    if seek_key:
+        query += seek(direction)
+        query_params += seek_params(seek_key)
+    query += f"\n    ORDER BY {order_desc if direction == 'prev' else order_asc}\n    LIMIT %s"
+    query_params.append(per_page + 1)
+
+    cursor.execute(query, tuple(query_params))
+    rows = cursor.fetchall()
+    has_more = len(rows) > per_page
+
+    if direction == 'prev':
+        # The extra row is the last one of the page before this one
+        if has_more:
+            extra = rows[per_page]
+            page_index.record(fkey, per_page, page, (extra[0], extra[1]))
+        else:
+            page = 1
+        rows = rows[:per_page]
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        rows = rows[:per_page]
+        has_next, has_prev = has_more, seek_key is not None
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first_key = (rows[0][0], rows[0][1])
+        last_key = (rows[-1][0], rows[-1][1])
+        if has_next:
+            page_index.record(fkey, per_page, page + 1, last_key)
+            next_cursor = encode_cursor(last_key, 'next')
+        if has_prev:
+            prev_cursor = encode_cursor(first_key, 'prev')
+    return rows, page, next_cursor, prev_cursor
+
+def estimate_report_count(cursor, filters):
+    """
+    Optimizer row estimate for a billing month / customer class, without touching the data.
+    """
+    query = f"EXPLAIN SELECT 1 FROM {sales_table_for(filters.get('billing_month'))} s WHERE s.Billing_Month = %s"
+    params = [filters.get('billing_month')]
+    if filters.get('cust_cl_cd'):
+        query += " AND s.Cust_Cl_Cd = %s"
+        params.append(filters.get('cust_cl_cd'))
+    cursor.execute(query, tuple(params))
+    plan = cursor.fetchall()
+    if not plan or plan[0].get('rows') is None:
+        return None
+    filtered = float(plan[0].get('filtered') or 100)
+    return int(plan[0]['rows'] * filtered / 100)
+
+def _refine_count(key, count_query, params):
+    conn = get_db_connection()
+    try:
+        if not conn:
+            return
+        rows = conn.query(count_query, params, name='report_count')
+        count_cache.set(key, rows[0]['total'] if rows else 0)
+    except Error as e:
+        app.logger.error(f"Background count refinement failed: {e}")
+    finally:
+        if conn:
+            conn.close()
+        with _refining_lock:
+            _refining_counts.discard(key)
+
+def report_total(conn, cursor, count_query, params, filters, estimate=False):
+    """
+    Total row count for a report filter set. Returns (total, is_estimate).
+    """
+    table = sales_table_for(filters.get('billing_month'))
+    key = ('report_count', filter_key(filters), table_version(cursor, table))
+    total = count_cache.get(key)
+    if total is not None:
+        return total, False
+
+    wide = not any(filters.get(f) for f in ('unit', 'region', 'zone', 'subzone', 'area', 'search'))
+    if estimate and wide:
+        estimated = estimate_report_count(cursor, filters)
+        if estimated is not None and estimated >= COUNT_ESTIMATE_MIN_ROWS:
+            with _refining_lock:
+                start = key not in _refining_counts
+                _refining_counts.add(key)
+            if start:
+                count_executor.submit(_refine_count, key, count_query, list(params))
+            return estimated, True
+
+    count_rows = conn.query(count_query, params, name='report_count')
+    total = count_rows[0]['total'] if count_rows else 0
+    count_cache.set(key, total)
+    return total, False
+
 # FIXED: Improved report_results with better error handling
 @app.route("/report_results")
 def report_results():
@@ -469,8 +824,22 @@ def report_results():
         per_page = 50
 
     # Calculate offset
+    page = max(page, 1)
     offset = (page - 1) * per_page
 
+    # Pages of a finished background job come from its artifact, not from MySQL
+    if request.args.get('job'):
+        return report_job_page(request.args.get('job'), page, per_page)
+
+    # 'keyset' seeks on (area, sale key) so page cost stays flat at any depth
+    mode = request.args.get('mode', REPORT_PAGINATION)
+    if mode not in ('offset', 'keyset'):
+        mode = 'offset'
+    count_mode = request.args.get('count_mode', REPORT_COUNT_MODE)
+    search = request.args.get('q', '').strip()[:200]
+    if mode == 'keyset' and request.args.get('cursor') and decode_cursor(request.args.get('cursor')) is None:
+        return jsonify({'error': 'Invalid page cursor'}), 400
+
     # FIXED: Add validation for required filters
   # FIX: only billing month is required
     if not filters.get('billing_month'):
@@ -478,97 +847,73 @@ def report_results():
 
 
     # Base query components
-    base_where = """
-  WHERE s.Billing_Month = %s
-  AND (%s IS NULL OR s.Cust_Cl_Cd = %s)
-  AND (%s IS NULL OR r.Unit_Cd = %s)
-  AND (%s IS NULL OR r.Region_Cd = %s)
-  AND (%s IS NULL OR r.Zone_Cd = %s)
-  AND (%s IS NULL OR r.SubZone_Cd = %s)
-  AND (%s IS NULL OR r.Area_Cd = %s)
-"""
-
-    params = [
-        filters.get('billing_month'),
-        filters.get('cust_cl_cd'), filters.get('cust_cl_cd'),
-        filters.get('unit'), filters.get('unit'),
-        filters.get('region'), filters.get('region'),
-        filters.get('zone'), filters.get('zone'),
-        filters.get('subzone'), filters.get('subzone'),
-        filters.get('area'), filters.get('area')
-    ]
+    base_where, params = report_where(filters)
+    try:
+        sales_table = sales_table_for(filters.get('billing_month'))
+    except Error as e:
+        app.logger.error(f"Sales table discovery failed: {e}")
+        return jsonify({'error': f'Sales table discovery failed: {e}'}), 503
 
-    # Add optional filters
-   
+    # Search terms take part in the cache keys for counts and page boundaries
+    search_filters = dict(filters, search=search) if search else filters
 
-    # Count total records
-    count_query = f"""
-    SELECT COUNT(*) as total
-    FROM ssgc_reports r
-    INNER JOIN ngrlng_sale_202506 s ON r.Area_Cd = s.AREA
-    {base_where}
-    """
+    # Only the profile's columns are selected, converted and rendered
+    profile, columns = report_projection(session['username'])
 
     # Main query with pagination
-    main_query = f"""
-    SELECT 
-        r.*,
-        s.Billing_Month,
-        s.Cust_Cl_Cd,
-        s.Gas_Charges,
-        s.Meter_Rent,
-        s.GST,
-        s.Total_SCM,
-        s.Total_MMBTU,
-        s.Less_Prov_Bills,
-        s.Arrears,
-        s.Total_Cur_Bill,
-        s.Total_Net_Bill,
-        s.LPS_Charged,
-        s.LPS,
-        s.Debit_Dr,
-        s.Credit_Cr,
-        s.Last_Payment,
-        s.Misc_Adj,
-        s.Others_Adj,
-        s.Other_Amt,
-        s.Other_CM,
-        s.Other_MMBTU,
-        s.Op_Bal,
-        s.Cl_Bal,
-        s.WoglamtCM,
-        s.WoglamtMMBTU,
-        s.NP_Fixed_Charges,
-        s.P_Fixed_Charges,
-        s.Levy_Charges,
-        s.Levy_Adj,
-        s.NP_Fix_Adj,
-        s.P_Fix_Adj
-    FROM ssgc_reports r
-    INNER JOIN ngrlng_sale_202506 s ON r.Area_Cd = s.AREA
-    {base_where}
-    LIMIT %s OFFSET %s
-    """
-
-    # Add pagination params
-    main_params = params + [per_page, offset]
-
+    main_select = report_page_select(columns, sales_table, seek=(mode == 'keyset'))
     conn = get_db_connection()
     total_records = 0
+    count_estimated = False
     results = []
+    next_cursor = prev_cursor = None
     
     if conn:
         try:
             cursor = conn.cursor(dictionary=True)
-            
-            # Get total count
-            cursor.execute(count_query, tuple(params))
-            count_result = cursor.fetchone()
-            total_records = count_result['total'] if count_result else 0
-            
-            # Get paginated results
-            cursor.execute(main_query, tuple(main_params))
-            results = cursor.fetchall()
+
+            # The rendered page (count + display rows) is cached per filters/page and table version
+            page_key = cache_key('report_cells', filter_key(search_filters), page, per_page, mode,
+                                 request.args.get('cursor'), [name for name, _, _ in columns],
+                                 table_version(cursor, sales_table))
+            cached = result_cache.get(page_key)
+            if cached is not None:
+                total_records, results, page, next_cursor, prev_cursor = cached
+            else:
+                # Full-result search: index lookups become IN lists on indexed columns
+                search_where, search_params = report_search(cursor, filters, search)
+                base_where += search_where
+                params = params + search_params
+
+                # Count total records
+                count_query = report_count_query(sales_table, base_where)
+
+                # Get total count (cached per filter set)
+                total_records, count_estimated = report_total(
+                    conn, cursor, count_query, params, search_filters, estimate=(count_mode == 'estimate'))
+
+                # Get paginated results as tuples; the page is formatted column by column
+                # into display strings, dropping the two seek key columns in keyset mode
+                if mode == 'keyset':
+                    row_cursor = conn.cursor(name='report_page')
+                    try:
+                        rows, page, next_cursor, prev_cursor = fetch_keyset_page(
+                            row_cursor, main_select, base_where, params, filter_key(search_filters),
+                            page, per_page, request.args.get('cursor'), sales_table)
+                    finally:
+                        row_cursor.close()
+                else:
+                    main_query = main_select + base_where + "\n    LIMIT %s OFFSET %s"
+                    main_params = params + [per_page, offset]
+                    rows = conn.query(main_query, main_params, dictionary=False, name='report_page')
+                names = [name for name, _, _ in columns]
+                if mode == 'keyset':
+                    results = format_rows(['_seek_area', '_seek_key'] + names, rows, skip=2)
+                else:
+                    results = format_rows(names, rows)
+                if not count_estimated:
+                    result_cache.set(page_key, (total_records, results, page, next_cursor, prev_cursor),
+                                     tag=sales_table)
             
             app.logger.info(f"Found {total_records} total records, showing {len(results)} on page {page}")
             
@@ -592,65 +937,423 @@ def report_results():
                          page=page,
                          per_page=per_page,
                          total_records=total_records,
-                         total_pages=total_pages)
+                         total_pages=total_pages,
+                         count_estimated=count_estimated,
+                         columns=columns,
+                         profile=profile,
+                         profiles=list(COLUMN_PROFILES),
+                         all_columns=REPORT_COLUMNS,
+                         mode=mode,
+                         search=search,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
+                         job_id=None,
+                         jobs_enabled=report_jobs is not None)
+
+@app.route('/export_report')
+def export_report():
+    """
+    Export the whole filtered report (not just the current page) as CSV, XLSX or Parquet.
+    Only the columns listed in ?columns= are selected; default is every report column.
 
-@app.route('/generate_summary_report', methods=['POST'])
-def generate_summary_report():
+    CSV is streamed batch by batch as rows come off the cursor. XLSX and Parquet
+    are buffered: the file is written in full to a temp file (holding the export
+    slot and the DB connection) before any bytes are sent. For very large
+    reports use a background job (/report_jobs) and download from its artifact.
+    """
     if "username" not in session:
         return redirect(url_for("login"))
-    
-    # Get all filter parameters from the form
-    filters = {
-        'billing_month': request.form.get('billing_month'),
-        'cust_cl_cd': request.form.get('cust_cl_cd'),
-        'unit': request.form.get('unit'),
-        'region': request.form.get('region'),
-        'zone': request.form.get('zone'),
-        'subzone': request.form.get('subzone'),
-        'area': request.form.get('area'),
-    }
-    
-    # Store filters in session
-    session['summary_filters'] = filters
-    
-    return redirect(url_for('summary_report'))
 
-@app.route("/summary_report")
-def summary_report():
-    if "username" not in session:
-        return redirect(url_for("login"))
-    
-    # ✅ Reuse filters from detailed report
     filters = session.get('report_filters', {})
-    if not filters:
+    if not filters or not filters.get('billing_month'):
         return redirect(url_for("gen_report"))
 
-    # Get grouping level
-    group_by = request.args.get('group_by', 'Region_Descr')
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+    if not format_available(fmt):
+        return jsonify({'error': f'{fmt} export is not available on this server'}), 501
 
-    # --- Base WHERE with proper filtering ---
-    base_where = """
-    WHERE s.Billing_Month = %s
-    AND (%s IS NULL OR s.Cust_Cl_Cd = %s)
-"""
-    params = [filters.get('billing_month'),
-                filters.get('cust_cl_cd'), filters.get('cust_cl_cd')]
-
-
-    # Add geographic filters if they exist
-    geographic_filters = [
-        ('unit', 'r.Unit_Cd'),
-        ('region', 'r.Region_Cd'),
-        ('zone', 'r.Zone_Cd'),
-        ('subzone', 'r.SubZone_Cd'),
-        ('area', 'r.Area_Cd')
-    ]
+    requested = [c for c in request.args.get('columns', '').split(',') if c]
+    columns = [col for col in REPORT_COLUMNS if not requested or col[0] in requested]
+    if not columns:
+        return jsonify({'error': 'No valid columns selected'}), 400
+
+    try:
+        sales_table = sales_table_for(filters.get('billing_month'))
+    except Error as e:
+        app.logger.error(f"Sales table discovery failed: {e}")
+        return jsonify({'error': f'Sales table discovery failed: {e}'}), 503
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Database connection failed'}), 500
+
+    base_where, params = report_where(filters)
+    search = request.args.get('q', '').strip()[:200]
+    if search:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            search_where, search_params = report_search(cursor, filters, search)
+        except Error as e:
+            app.logger.error(f"Search index error in export_report: {e}")
+            search_where = None
+        finally:
+            cursor.close()
+        if search_where is None:
+            conn.close()
+            return jsonify({'error': 'Search is unavailable'}), 500
+        base_where += search_where
+        params = params + search_params
+
+    export_query = f"""
+    SELECT {select_list(columns)}
+    FROM ssgc_reports r
+    INNER JOIN {sales_table} s ON r.Area_Cd = s.AREA
+    {base_where}
+    """
+
+    def batches():
+        # Unbuffered tuple cursor: rows are pulled from the server one batch at a time
+        cursor = conn.cursor()
+        try:
+            cursor.execute(export_query, tuple(params))
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                yield rows
+        except Error as e:
+            app.logger.error(f"Database error in export_report: {e}")
+            if fmt != 'csv':
+                # A file export is written in full first, so it can still fail cleanly
+                raise
+        finally:
+            try:
+                cursor.close()
+            except Error:
+                pass
+            conn.close()
+
+    header = [label for _, _, label in columns]
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    if fmt == 'csv':
+        body = iter_csv(header, batches())
+    else:
+        types = export_column_types(conn, columns, sales_table) if fmt == 'parquet' else None
+        rows = batches()
+        body, error = file_export(fmt, header, rows, extension, types)
+        if error is not None:
+            # Closing the generator closes its half-read cursor and the connection
+            rows.close()
+            conn.close()
+            return error
+
+    filename = f"ssgc_report_{filters.get('billing_month')}.{extension}"
+    response = Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no',
+    })
+    # Hand the connection back even if the client disconnects before streaming starts
+    response.call_on_close(conn.close)
+    # Hold the export slot until the stream is finished, not just until the view returns
+    group = g.pop('route_group', None)
+    if group is not None:
+        response.call_on_close(lambda: route_limiter.release(group))
+    return response
+
+def export_column_types(conn, columns, sales_table):
+    """
+    Declared MySQL types of the report columns, so file exports get a fixed schema.
+    None (types inferred from the data) if the lookup fails.
+    """
+    cursor = conn.cursor()
+    try:
+        return column_types(cursor, [(REPORTS_TABLE if alias == 'r' else sales_table, name)
+                                     for name, alias, _ in columns])
+    except Error as e:
+        app.logger.warning(f"Could not read report column types: {e}")
+        return None
+    finally:
+        cursor.close()
+
+def file_export(fmt, header, batches, extension, column_types=None):
+    """
+    Write an XLSX or Parquet export in full. Returns (body, None), or
+    (None, error response) when the writer fails, instead of a truncated file.
+    """
+    if fmt == 'xlsx':
+        writer = write_xlsx
+    else:
+        writer = lambda path, header, batches: write_parquet(path, header, batches, column_types)
+    try:
+        return iter_file_export(writer, header, batches, extension), None
+    except (ValueError, OSError, Error) as e:
+        app.logger.error(f"{fmt} export failed: {e}")
+        return None, (jsonify({'error': f'{fmt} export failed: {e}'}), 500)
+
+def run_report_job(job, path, progress):
+    """
+    Body of a background report job: stream the whole filtered report, every
+    report column, from MySQL into a columnar artifact at `path`.
+    """
+    filters, search = job['params']['filters'], job['params']['search']
+    metrics.set_route('report_job')
+    sales_table = sales_table_for(filters.get('billing_month'))
+    conn = get_db_connection()
+    if not conn:
+        raise Error("Database connection failed")
+    try:
+        base_where, params = report_where(filters)
+        cursor = conn.cursor(dictionary=True)
+        try:
+            search_where, search_params = report_search(cursor, filters, search)
+            # Progress is measured against the optimizer's row estimate, not an exact count
+            expected = estimate_report_count(cursor, filters)
+        finally:
+            cursor.close()
+        progress(0, expected)
+
+        job_query = f"""
+    SELECT {select_list(REPORT_COLUMNS)}
+    FROM ssgc_reports r
+    INNER JOIN {sales_table} s ON r.Area_Cd = s.AREA
+    {base_where + search_where}
+    """
+        writer = None
+        cursor = conn.cursor(name='report_job')
+        try:
+            writer = ColumnarWriter(path, [name for name, _, _ in REPORT_COLUMNS], row_group_size=EXPORT_BATCH_SIZE)
+            cursor.execute(job_query, tuple(params + search_params))
+            written = 0
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                writer.write_rows(rows)
+                written += len(rows)
+                progress(written)
+            writer.close()
+        except Exception:
+            if writer is not None:
+                writer.abort()
+            raise
+        finally:
+            cursor.close()
+    finally:
+        conn.close()
+        metrics.set_route(None)
+
+def job_json(job):
+    payload = {key: job[key] for key in ('id', 'state', 'rows', 'expected', 'error',
+                                         'submitted_at', 'started_at', 'finished_at')}
+    payload['status_url'] = url_for('report_job_status', job_id=job['id'])
+    if job['state'] == 'done':
+        payload['results_url'] = url_for('report_results', job=job['id'])
+        payload['download_url'] = url_for('download_report_job', job_id=job['id'])
+    return payload
+
+def load_job(job_id):
+    """
+    The signed-in user's job record, or None.
+    """
+    if report_jobs is None:
+        return None
+    job = report_jobs.get(job_id)
+    if job is None or job['owner'] != session.get('username'):
+        return None
+    return job
+
+@app.route('/report_jobs', methods=['POST'])
+def submit_report_job():
+    """
+    Queue the current report as a background job and return its ID straight away.
+    """
+    if "username" not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    if report_jobs is None:
+        return jsonify({'error': 'Background reports are unavailable'}), 503
+
+    filters = session.get('report_filters', {})
+    if not filters or not filters.get('billing_month'):
+        return jsonify({'error': 'No report filters'}), 400
+
+    search = (request.form.get('q') or request.args.get('q') or '').strip()[:200]
+    try:
+        job = report_jobs.submit(session['username'], {'filters': filters, 'search': search}, run_report_job)
+    except OSError as e:
+        app.logger.error(f"Could not queue report job: {e}")
+        return jsonify({'error': 'Background reports are unavailable'}), 500
+    return jsonify(job_json(job)), 202
+
+@app.route('/report_jobs/<job_id>')
+def report_job_status(job_id):
+    if "username" not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    job = load_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_json(job))
+
+def report_job_page(job_id, page, per_page):
+    """
+    One page of a finished job's artifact, rendered like a live report_results page.
+    """
+    job = load_job(job_id)
+    if job is None or job['state'] != 'done':
+        return redirect(url_for('report_results', per_page=per_page))
+    try:
+        reader = ColumnarReader(report_jobs.artifact_path(job_id))
+    except (OSError, ValueError) as e:
+        app.logger.error(f"Report job artifact {job_id} unreadable: {e}")
+        return redirect(url_for('report_results', per_page=per_page))
+
+    profile, columns = report_projection(session['username'])
+    names = [name for name, _, _ in columns]
+    total_records = reader.num_rows
+    total_pages = (total_records + per_page - 1) // per_page if total_records > 0 else 1
+    page = min(page, total_pages)
+    results = format_rows(names, reader.read((page - 1) * per_page, per_page, names))
+
+    return render_template("report_results.html",
+                         results=results,
+                         filters=job['params']['filters'],
+                         page=page,
+                         per_page=per_page,
+                         total_records=total_records,
+                         total_pages=total_pages,
+                         count_estimated=False,
+                         columns=columns,
+                         profile=profile,
+                         profiles=list(COLUMN_PROFILES),
+                         all_columns=REPORT_COLUMNS,
+                         mode='offset',
+                         search=job['params']['search'],
+                         next_cursor=None,
+                         prev_cursor=None,
+                         job_id=job_id)
+
+@app.route('/report_jobs/<job_id>/download')
+def download_report_job(job_id):
+    """
+    Stream a finished job's artifact as CSV, XLSX or Parquet, like export_report
+    but without going back to MySQL.
+    """
+    if "username" not in session:
+        return redirect(url_for("login"))
+    job = load_job(job_id)
+    if job is None or job['state'] != 'done':
+        return jsonify({'error': 'Job not found or not finished'}), 404
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+    if not format_available(fmt):
+        return jsonify({'error': f'{fmt} export is not available on this server'}), 501
+
+    requested = [c for c in request.args.get('columns', '').split(',') if c]
+    columns = [col for col in REPORT_COLUMNS if not requested or col[0] in requested]
+    if not columns:
+        return jsonify({'error': 'No valid columns selected'}), 400
+    try:
+        reader = ColumnarReader(report_jobs.artifact_path(job_id))
+    except (OSError, ValueError) as e:
+        app.logger.error(f"Report job artifact {job_id} unreadable: {e}")
+        return jsonify({'error': 'Job results are no longer available'}), 410
+
+    batches = reader.iter_batches([name for name, _, _ in columns])
+    header = [label for _, _, label in columns]
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    if fmt == 'csv':
+        body = iter_csv(header, batches)
+    else:
+        types = None
+        if fmt == 'parquet':
+            try:
+                sales_table = sales_table_for(job['params']['filters'].get('billing_month'))
+            except Error as e:
+                app.logger.warning(f"Sales table discovery failed, inferring Parquet types: {e}")
+                sales_table = None
+            conn = get_db_connection() if sales_table else None
+            if conn:
+                try:
+                    types = export_column_types(conn, columns, sales_table)
+                finally:
+                    conn.close()
+        body, error = file_export(fmt, header, batches, extension, types)
+        if error is not None:
+            return error
+
+    filename = f"ssgc_report_{job['params']['filters'].get('billing_month')}.{extension}"
+    response = Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no',
+    })
+    group = g.pop('route_group', None)
+    if group is not None:
+        response.call_on_close(lambda: route_limiter.release(group))
+    return response
+
+def use_monthly_rollup(conn, billing_month, build=False):
+    """
+    True when the area rollup for this month is current. Request paths never
+    build it: a missing or stale rollup is rebuilt in the background and the
+    caller uses the raw join meanwhile. build=True (the warmer) builds inline.
+    """
+    table = sales_table_for(billing_month)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        version = table_version(cursor, table)
+    except Error as e:
+        app.logger.error(f"Could not read sales table version: {e}")
+        return False
+    finally:
+        cursor.close()
+    if rollups.ensure(conn, billing_month, table, version, build=build):
+        return True
+    if not build:
+        rollups.build_async(get_db_connection, billing_month, table, version)
+    return False
+
+def build_monthly_rollup(billing_month):
+    table_registry.ensure_loaded()
+    conn = get_db_connection()
+    if not conn:
+        raise Error("Database connection failed")
+    try:
+        use_monthly_rollup(conn, billing_month, build=True)
+    finally:
+        conn.close()
+
+@app.route('/generate_summary_report', methods=['POST'])
+def generate_summary_report():
+    if "username" not in session:
+        return redirect(url_for("login"))
+    
+    # Get all filter parameters from the form
+    filters = {
+        'billing_month': request.form.get('billing_month'),
+        'cust_cl_cd': request.form.get('cust_cl_cd'),
+        'unit': request.form.get('unit'),
+        'region': request.form.get('region'),
+        'zone': request.form.get('zone'),
+        'subzone': request.form.get('subzone'),
+        'area': request.form.get('area'),
+    }
     
-    for filter_name, column_name in geographic_filters:
-        filter_value = filters.get(filter_name)
-        if filter_value:
-            base_where += f" AND {column_name} = %s"
-            params.append(filter_value)
+    # Store filters in session
+    session['summary_filters'] = filters
+    
+    return redirect(url_for('summary_report'))
+
+def build_summary_query(filters, group_by, use_rollup=False):
+    """
+    Summary SQL and params for the session filters, from the rollup or the raw join.
+    """
+    sale = 'r' if use_rollup else 's'
+
+    # --- Base WHERE with only the active filters ---
+    base_where, params = filter_where(filters, sale=sale)
 
     # ✅ Pick group-by columns dynamically and build SELECT accordingly
     if group_by == "Unit_Descr":
@@ -687,38 +1390,74 @@ def summary_report():
         "COALESCE(SUM(s.Total_MMBTU), 0) as Total_MMBTU_Consumed",
         "COALESCE(AVG(s.Total_MMBTU), 0) as Avg_MMBTU_Per_Account"
     ]
+    from_clause = f"""FROM ssgc_reports r
+    INNER JOIN {sales_table_for(filters.get('billing_month'))} s ON r.Area_Cd = s.AREA"""
+    if use_rollup:
+        metrics_columns = SUMMARY_METRICS
+        from_clause = f"FROM {ROLLUP_TABLE} r"
 
     summary_query = f"""
     SELECT {', '.join(select_columns + metrics_columns)}
-    FROM ssgc_reports r
-    INNER JOIN ngrlng_sale_202506 s ON r.Area_Cd = s.AREA
+    {from_clause}
     {base_where}
     {group_by_clause}
     {order_by_clause}
     """
+    return summary_query, params
 
-    summary_results = []
+def load_summary(filters, group_by):
+    """
+    Summary rows for the filters grouped by `group_by`, cached per filters,
+    grouping and sales-table version.
+    """
+    sales_table = sales_table_for(filters.get('billing_month'))
     conn = get_db_connection()
-    if conn:
+    if not conn:
+        raise Error("Database connection failed")
+    try:
+        cursor = conn.cursor(dictionary=True)
         try:
-            cursor = conn.cursor(dictionary=True)
+            version = table_version(cursor, sales_table)
+        finally:
+            cursor.close()
+        summary_key = cache_key('summary', filter_key(filters), group_by, version)
+        summary_results = result_cache.get(summary_key)
+        if summary_results is None:
+            # Roll up from the per-area table when it is current, else aggregate the raw join
+            use_rollup = use_monthly_rollup(conn, filters.get('billing_month'))
+            summary_query, params = build_summary_query(filters, group_by, use_rollup)
             app.logger.info(f"Summary SQL: {summary_query}")
             app.logger.info(f"Summary SQL params: {params}")
-            cursor.execute(summary_query, tuple(params))
-            summary_results = cursor.fetchall()
-            
-            # Log the first few results for debugging
-            for i, row in enumerate(summary_results[:3]):
-                app.logger.info(f"Row {i}: {row}")
-                
-        except Error as e:
-            app.logger.error(f"Database error in summary_report: {e}")
-            summary_results = []
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
+            summary_results = conn.query(summary_query, params, name='summary')
+            result_cache.set(summary_key, summary_results, tag=sales_table)
+        return summary_results
+    finally:
+        conn.close()
+
+@app.route("/summary_report")
+def summary_report():
+    if "username" not in session:
+        return redirect(url_for("login"))
+    
+    # ✅ Reuse filters from detailed report
+    filters = session.get('report_filters', {})
+    if not filters:
+        return redirect(url_for("gen_report"))
+
+    # Get grouping level
+    group_by = group_by_column(request.args.get('group_by'))
+
+    summary_results = []
+    try:
+        summary_results = load_summary(filters, group_by)
+
+        # Log the first few results for debugging
+        for i, row in enumerate(summary_results[:3]):
+            app.logger.info(f"Row {i}: {row}")
+
+    except Error as e:
+        app.logger.error(f"Database error in summary_report: {e}")
+        summary_results = []
 
     return render_template(
         "summary_report.html",
@@ -728,65 +1467,98 @@ def summary_report():
     )
 
 
+@app.route("/trend_report")
+def trend_report():
+    """
+    Month-by-group trend of the summary metrics over a billing month range.
+
+    Each month's sales table is aggregated concurrently into additive partial
+    sums/counts, which are merged here so averages are recomputed from totals.
+    """
+    if "username" not in session:
+        return redirect(url_for("login"))
+
+    filters = session.get('report_filters', {})
+    if not filters:
+        return redirect(url_for("gen_report"))
+
+    group_by = request.args.get('group_by', 'Region_Descr')
+    group_cols = group_columns(group_by)
+    start_month = request.args.get('start_month') or filters.get('billing_month')
+    end_month = request.args.get('end_month') or start_month
+    metric = request.args.get('metric', 'Total_Net_Bill')
+    if metric not in TREND_METRICS:
+        metric = 'Total_Net_Bill'
+
+    def month_partials(billing_month, table):
+        conn = get_db_connection()
+        if not conn:
+            raise Error("Database connection failed")
+        try:
+            use_rollup = use_monthly_rollup(conn, billing_month)
+            where, params = filter_where(dict(filters, billing_month=billing_month),
+                                         sale='r' if use_rollup else 's')
+
+            return conn.query(partial_query(table, group_cols, where, use_rollup), params, name='trend_partials')
+        finally:
+            conn.close()
+
+    error = None
+    available_months = []
+    month_rows = []
+    try:
+        available_months = table_registry.billing_months()
+        if start_month:
+            month_rows = table_registry.fan_out_range(start_month, end_month, month_partials)
+    except Error as e:
+        app.logger.error(f"Database error in trend_report: {e}")
+        error = str(e)
+    matrix = build_matrix(month_rows, group_cols)
+
+    if request.args.get('format') == 'json':
+        if error:
+            return jsonify({'error': error}), 500
+        return jsonify(matrix)
+
+    return render_template(
+        "trend_report.html",
+        matrix=matrix,
+        metric=metric,
+        metrics=list(TREND_METRICS),
+        group_by=group_cols[-1],
+        start_month=start_month,
+        end_month=end_month,
+        available_months=available_months,
+        filters=filters,
+        error=error
+    )
+
+
 # --------- Custom Jinja Filters ---------
 @app.template_filter('format_number')
 def format_number(value):
-    try:
-        return "{:,.0f}".format(float(value))
-    except (ValueError, TypeError):
-        return value
+    return format_value(value, NUMBER)
 
 @app.template_filter('format_currency')
 def format_currency(value):
-    try:
-        return "Rs. {:,.2f}".format(float(value))
-    except (ValueError, TypeError):
-        return value
+    return format_value(value, CURRENCY)
 
 @app.template_filter('format_decimal')
 def format_decimal(value):
-    try:
-        return "{:,.2f}".format(float(value))
-    except (ValueError, TypeError):
-        return value
+    return format_value(value, DECIMAL)
 
-@app.route("/chart_view")
-def chart_view():
-    if "username" not in session:
-        return redirect(url_for("login"))
-    
-    # Get chart parameters from request
-    group_by = request.args.get('group_by', 'Region_Descr')
-    selected_area = request.args.get('area')
-    chart_type = request.args.get('chart_type', 'bar')
-    
-    # Get filters from session
-    filters = session.get('report_filters', {})
-    if not filters:
-        return redirect(url_for("gen_report"))
+CHART_METRIC_NAMES = ["Total_Records", "Total_Gas_Charges", "Total_Net_Bill", "Total_SCM_Consumed"]
+CHART_DATA_METRICS = CHART_METRIC_NAMES + ["Total_Meter_Rent", "Total_GST", "Total_Arrears",
+                                           "Total_Last_Payments", "Total_MMBTU_Consumed"]
 
-    # --- Query for chart data ---
-    base_where = """
-    WHERE s.Billing_Month = %s
-    AND (%s IS NULL OR s.Cust_Cl_Cd = %s)
-    AND (%s IS NULL OR r.Unit_Cd = %s)
-    AND (%s IS NULL OR r.Region_Cd = %s)
-    AND (%s IS NULL OR r.Zone_Cd = %s)
-    AND (%s IS NULL OR r.SubZone_Cd = %s)
-    AND (%s IS NULL OR r.Area_Cd = %s)
-    """
-
-    params = [
-        filters.get('billing_month'),
-        filters.get('cust_cl_cd'), filters.get('cust_cl_cd'),
-        filters.get('unit'), filters.get('unit'),
-        filters.get('region'), filters.get('region'),
-        filters.get('zone'), filters.get('zone'),
-        filters.get('subzone'), filters.get('subzone'),
-        filters.get('area'), filters.get('area')
-    ]
+def build_chart_query(filters, group_by, use_rollup=False):
+    """
+    Chart SQL and params for the session filters, from the rollup or the raw join.
+    """
+    sale = 'r' if use_rollup else 's'
 
-   
+    group_by = group_by_column(group_by)
+    base_where, params = filter_where(filters, sale=sale)
 
     # Query for chart data
     chart_query = f"""
@@ -802,63 +1574,106 @@ def chart_view():
         COALESCE(SUM(s.Total_SCM), 0) as Total_SCM_Consumed,
         COALESCE(SUM(s.Total_MMBTU), 0) as Total_MMBTU_Consumed
     FROM ssgc_reports r
-    LEFT JOIN ngrlng_sale_202506 s ON r.Area_Cd = s.AREA
+    LEFT JOIN {sales_table_for(filters.get('billing_month'))} s ON r.Area_Cd = s.AREA
+    {base_where}
+    GROUP BY r.{group_by}
+    ORDER BY group_name
+    """
+    if use_rollup:
+        chart_query = f"""
+    SELECT 
+        COALESCE(r.{group_by}, 'All') as group_name,
+        {', '.join(CHART_METRICS)}
+    FROM {ROLLUP_TABLE} r
     {base_where}
     GROUP BY r.{group_by}
     ORDER BY group_name
     """
+    return chart_query, params
 
-    chart_data = None
+def fetch_chart_results(filters, group_by):
+    """
+    Chart aggregates for the session filters grouped by `group_by`, cached like summaries.
+    Returns (rows, data_version) where data_version changes when the month is reloaded.
+    """
+    sales_table = sales_table_for(filters.get('billing_month'))
     conn = get_db_connection()
-    if conn:
+    if not conn:
+        raise Error("Database connection failed")
+
+    try:
+        cursor = conn.cursor(dictionary=True)
         try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute(chart_query, tuple(params))
-            chart_results = cursor.fetchall()
-            
-            if chart_results:
-                # Generate charts for all metrics
-                chart_data = {
-                    "Total_Records": generate_summary_chart(
-                        chart_results, 
-                        group_by=group_by, 
-                        selected_area=selected_area, 
-                        chart_type=chart_type,
-                        metric="Total_Records"
-                    ),
-                    "Total_Gas_Charges": generate_summary_chart(
-                        chart_results, 
-                        group_by=group_by, 
-                        selected_area=selected_area, 
-                        chart_type=chart_type,
-                        metric="Total_Gas_Charges"
-                    ),
-                    "Total_Net_Bill": generate_summary_chart(
-                        chart_results, 
-                        group_by=group_by, 
-                        selected_area=selected_area, 
-                        chart_type=chart_type,
-                        metric="Total_Net_Bill"
-                    ),
-                    "Total_SCM_Consumed": generate_summary_chart(
-                        chart_results, 
-                        group_by=group_by, 
-                        selected_area=selected_area, 
-                        chart_type=chart_type,
-                        metric="Total_SCM_Consumed"
-                    )
-                }
-                
-        except Error as e:
-            app.logger.error(f"Database error in chart_view: {e}")
+            data_version = table_version(cursor, sales_table)
         finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
+            cursor.close()
+        chart_cache_key = cache_key('chart', filter_key(filters), group_by, data_version)
+        chart_results = result_cache.get(chart_cache_key)
+        if chart_results is None:
+            # Roll up from the per-area table when it is current, else aggregate the raw join
+            use_rollup = use_monthly_rollup(conn, filters.get('billing_month'))
+            chart_query, params = build_chart_query(filters, group_by, use_rollup)
+            chart_results = conn.query(chart_query, params, name='chart')
+            result_cache.set(chart_cache_key, chart_results, tag=sales_table)
+    finally:
+        conn.close()
+    return chart_results, data_version
+
+def chart_image_key(filters, group_by, chart_type, metric, selected_area, data_version):
+    return chart_key(filter_key(filters), group_by, chart_type, metric, selected_area, data_version)
+
+@app.route("/chart_view")
+def chart_view():
+    if "username" not in session:
+        return redirect(url_for("login"))
+    
+    # Get chart parameters from request
+    group_by = group_by_column(request.args.get('group_by'))
+    selected_area = request.args.get('area')
+    chart_type = request.args.get('chart_type', 'bar')
+    
+    # Get filters from session
+    filters = session.get('report_filters', {})
+    if not filters:
+        return redirect(url_for("gen_report"))
+
+    render_mode = request.args.get('render', CHART_RENDERING)
+    if render_mode != 'server':
+        # The browser fetches /chart_data once and draws/switches charts itself
+        return render_template(
+            "chart_view.html",
+            render_mode='client',
+            chart_data=None,
+            chart_metrics=CHART_DATA_METRICS,
+            default_metrics=CHART_METRIC_NAMES,
+            group_by=group_by,
+            chart_type=chart_type,
+            selected_area=selected_area,
+            filters=filters
+        )
+
+    chart_data = None
+    try:
+        chart_results, data_version = fetch_chart_results(filters, group_by)
+        if chart_results:
+            # Render all metrics in parallel off the request thread; the page links to cached PNGs
+            image_keys = {
+                metric: chart_image_key(filters, group_by, chart_type, metric, selected_area, data_version)
+                for metric in CHART_METRIC_NAMES
+            }
+            with metrics.span('chart_render'):
+                keys = chart_renderer.render_many(chart_results, group_by, selected_area, chart_type, image_keys)
+            chart_data = {
+                metric: url_for('chart_image', key=key, metric=metric, group_by=group_by,
+                                chart_type=chart_type, area=selected_area)
+                for metric, key in keys.items() if key
+            }
+    except Error as e:
+        app.logger.error(f"Database error in chart_view: {e}")
 
     return render_template(
         "chart_view.html",
+        render_mode='server',
         chart_data=chart_data,
         group_by=group_by,
         chart_type=chart_type,
@@ -866,6 +1681,191 @@ def chart_view():
         filters=filters
     )
 
+@app.route("/chart_data")
+def chart_data_api():
+    """
+    Chart aggregates as column-oriented arrays (group names plus one array per metric),
+    ETag-tagged on the filters, grouping and table data version.
+    """
+    if "username" not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    filters = session.get('report_filters', {})
+    if not filters:
+        return jsonify({'error': 'No report filters'}), 400
+    group_by = group_by_column(request.args.get('group_by'))
+
+    try:
+        chart_results, data_version = fetch_chart_results(filters, group_by)
+    except Error as e:
+        app.logger.error(f"Database error in chart_data: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    payload = chart_columns(chart_results, CHART_DATA_METRICS)
+    payload['group_by'] = group_by
+    response = jsonify(payload)
+    response.set_etag(chart_key(filter_key(filters), group_by, None, None, None, data_version))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@app.route("/chart_image/<key>.png")
+def chart_image(key):
+    """
+    Serve a rendered chart PNG. On a cache miss (e.g. another worker rendered it)
+    the chart is re-rendered from the parameters in the query string.
+    """
+    if "username" not in session:
+        return redirect(url_for("login"))
+
+    png = chart_renderer.get(key)
+    if png is None:
+        filters = session.get('report_filters', {})
+        metric = request.args.get('metric', 'Total_Records')
+        group_by = group_by_column(request.args.get('group_by'))
+        chart_type = request.args.get('chart_type', 'bar')
+        selected_area = request.args.get('area')
+        if not filters or metric not in CHART_METRIC_NAMES:
+            return jsonify({'error': 'Chart not found'}), 404
+        try:
+            chart_results, data_version = fetch_chart_results(filters, group_by)
+        except Error as e:
+            app.logger.error(f"Database error in chart_image: {e}")
+            return jsonify({'error': str(e)}), 500
+        fresh_key = chart_image_key(filters, group_by, chart_type, metric, selected_area, data_version)
+        with metrics.span('chart_render'):
+            png = chart_renderer.render_one(chart_results, group_by, selected_area, chart_type, metric, fresh_key)
+        if png is None:
+            return jsonify({'error': 'Chart not found'}), 404
+
+    response = Response(png, mimetype='image/png')
+    response.headers['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+def warm_chart(filters, group_by, chart_type='bar'):
+    chart_results, data_version = fetch_chart_results(filters, group_by)
+    if CHART_RENDERING == 'server' and chart_results:
+        keys = {metric: chart_image_key(filters, group_by, chart_type, metric, None, data_version)
+                for metric in CHART_METRIC_NAMES}
+        chart_renderer.render_many(chart_results, group_by, None, chart_type, keys)
+
+def warmup_jobs(billing_month):
+    """
+    Warm-up jobs for a freshly loaded billing month with no other filters: its
+    area rollup, dropdown trees, the summary at every grouping level and the default chart view.
+    The billing month / customer class lists come from the table registry, which
+    is refreshed before a month is scheduled.
+    """
+    filters = {'billing_month': billing_month}
+    jobs = [('rollup', lambda: build_monthly_rollup(billing_month)),
+            ('hierarchy', lambda: get_hierarchy(billing_month))]
+    jobs += [(f"hierarchy:{cust_cl_cd}", lambda cust_cl_cd=cust_cl_cd: get_hierarchy(billing_month, cust_cl_cd))
+             for cust_cl_cd in table_registry.cust_classes(billing_month)]
+    jobs += [(f"summary:{group_by}", lambda group_by=group_by: load_summary(filters, group_by))
+             for group_by in GROUP_BY_COLUMNS]
+    jobs.append(('chart', lambda: warm_chart(filters, group_by_column(None))))
+    return jobs
+
+# New ngrlng_sale_YYYYMM tables are picked up by polling; their months are warmed
+# on a small pool (WARMUP_WORKERS jobs at a time) so the first users hit warm caches
+warmer = Warmer(warmup_jobs, max_workers=int(os.getenv('WARMUP_WORKERS', 2)), logger=app.logger)
+
+def warm_new_tables(tables):
+    for table in tables:
+        table_registry.refresh_table(table)
+        for billing_month in table_registry.months_for_table(table):
+            warmer.schedule(billing_month)
+
+# Opt-in: each worker process runs its own watcher, so enable it on one worker
+if os.getenv('WARMUP_WATCH', '0') == '1':
+    warmer.watch(table_registry.list_tables, warm_new_tables,
+                 interval=float(os.getenv('WARMUP_POLL_INTERVAL', 300)))
+
+@app.route('/warmup_status')
+def warmup_status():
+    if "username" not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    return jsonify(warmer.status())
+
+
+def representative_queries(filters):
+    """
+    (name, sql, params) for the queries the app issues under the given filters,
+    built by the same helpers the views use, for EXPLAIN.
+    """
+    billing_month = filters.get('billing_month')
+    cust_cl_cd = filters.get('cust_cl_cd')
+    sales_table = sales_table_for(billing_month)
+    base_where, params = report_where(filters)
+    _, columns = resolve_columns(REPORT_COLUMN_PROFILE, default=REPORT_COLUMN_PROFILE)
+    page_select = report_page_select(columns, sales_table)
+    seek_select = report_page_select(columns, sales_table, seek=True)
+    # Any seek key will do: the plan depends on the clause's shape, not its values
+    seek_key = ('', 0)
+    queries = [
+        ('report count', report_count_query(sales_table, base_where), params),
+        ('report page (offset)', page_select + base_where + "\n    LIMIT %s OFFSET %s", params + [50, 5000]),
+        ('report page (keyset)', seek_select + base_where + f"\n    ORDER BY {KEYSET_ORDER}\n    LIMIT %s",
+         params + [51]),
+        ('report page (keyset seek)', seek_select + base_where + seek_clause('next', 's.AREA', f"s.{SALE_ROW_KEY}")
+         + f"\n    ORDER BY {KEYSET_ORDER}\n    LIMIT %s", params + seek_params(seek_key) + [51]),
+        ('report page (keyset back)', seek_select + base_where + seek_clause('prev', 's.AREA', f"s.{SALE_ROW_KEY}")
+         + f"\n    ORDER BY {KEYSET_ORDER_DESC}\n    LIMIT %s", params + seek_params(seek_key) + [51]),
+        ('hierarchy', hierarchy_query(None, sales_table), [billing_month]),
+        ('search accounts', ACCOUNTS_QUERY.format(table=sales_table), [billing_month]),
+        ('billing month scan', SCAN_MONTHS.format(table=sales_table), []),
+        ('rollup build', ROLLUP_SELECT.format(table=sales_table), [billing_month]),
+    ]
+    if cust_cl_cd:
+        queries.append(('hierarchy (customer class)', hierarchy_query(cust_cl_cd, sales_table),
+                        [billing_month, cust_cl_cd]))
+    for use_rollup, source in ((False, ''), (True, ' (rollup)')):
+        trend_where, trend_params = filter_where(filters, sale='r' if use_rollup else 's')
+        queries.append((f'trend partials{source}', partial_query(sales_table, group_columns('Region_Descr'),
+                                                                 trend_where, use_rollup), trend_params))
+    for group_by in ('Region_Descr', 'Area_Descr'):
+        for use_rollup, source in ((False, ''), (True, ' (rollup)')):
+            queries.append((f'summary by {group_by}{source}', *build_summary_query(filters, group_by, use_rollup)))
+            queries.append((f'chart by {group_by}{source}', *build_chart_query(filters, group_by, use_rollup)))
+    return queries
+
+@app.cli.command('create-indexes')
+@click.option('--dry-run', is_flag=True, help='Only report which indexes are missing.')
+def create_indexes_command(dry_run):
+    """Create the composite indexes the report queries rely on."""
+    conn = get_db_connection()
+    if not conn:
+        raise click.ClickException("Database connection failed")
+    try:
+        results = ensure_indexes(conn, table_registry.tables(), row_key=SALE_ROW_KEY,
+                                 dry_run=dry_run, logger=app.logger)
+    finally:
+        conn.close()
+    for table, name, columns, action in results:
+        click.echo(f"{table:<24} {name:<30} ({', '.join(columns)}): {action}")
+
+@app.cli.command('explain-queries')
+@click.option('--billing-month', help='Billing month to plan for (default: latest).')
+@click.option('--cust-cl-cd', help='Customer class filter.')
+def explain_queries_command(billing_month, cust_cl_cd):
+    """EXPLAIN the report queries and flag full scans and filesorts."""
+    months = table_registry.billing_months()
+    billing_month = billing_month or (months[0] if months else None)
+    if not billing_month:
+        raise click.ClickException("No billing months found")
+    filters = {'billing_month': billing_month, 'cust_cl_cd': cust_cl_cd}
+
+    conn = get_db_connection()
+    if not conn:
+        raise click.ClickException("Database connection failed")
+    try:
+        report = advise(conn, representative_queries(filters))
+    finally:
+        conn.close()
+
+    click.echo(f"Query plans for billing month {billing_month}")
+    for name, issues in report:
+        click.echo(f"{name:<32} {'OK' if not issues else '; '.join(issues)}")
+
 
    
 if __name__ == '__main__':
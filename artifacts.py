@@ -0,0 +1,154 @@
+import json
+import os
+import struct
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+# File layout: MAGIC, row groups (one zlib'd JSON array per column), JSON footer,
+# footer length (8 bytes, little endian), MAGIC
+MAGIC = b'SSGCCOL1'
+_TRAILER = struct.Struct('<Q')
+
+# Types JSON can't hold are written as strings and restored on read
+_DECODERS = {
+    'Decimal': Decimal,
+    'date': date.fromisoformat,
+    'datetime': datetime.fromisoformat,
+}
+
+
+def _encode(values):
+    kind = next((type(v).__name__ for v in values if v is not None), None)
+    data = json.dumps(values, default=str, separators=(',', ':')).encode('utf-8')
+    return zlib.compress(data, 6), kind if kind in _DECODERS else None
+
+
+def _decode(blob, kind):
+    values = json.loads(zlib.decompress(blob))
+    decoder = _DECODERS.get(kind)
+    if decoder is None:
+        return values
+    return [None if v is None else decoder(v) for v in values]
+
+
+class ColumnarWriter:
+    """
+    Writes rows to a compact column-oriented file, row group by row group.
+
+    Each column of a row group is stored as its own compressed chunk, so a
+    reader can page through the file or pick out a few columns without
+    decoding the rest. The file is written under a temporary name and only
+    appears at `path` once close() succeeds.
+    """
+
+    def __init__(self, path, columns, row_group_size=5000):
+        self.path = path
+        self.columns = list(columns)
+        self.row_group_size = row_group_size
+        self.num_rows = 0
+        self._tmp_path = path + '.part'
+        self._fh = open(self._tmp_path, 'wb')
+        try:
+            self._fh.write(MAGIC)
+        except OSError:
+            self.abort()
+            raise
+        self._groups = []
+        self._pending = []
+
+    def write_rows(self, rows):
+        self._pending.extend(rows)
+        while len(self._pending) >= self.row_group_size:
+            self._flush(self._pending[:self.row_group_size])
+            del self._pending[:self.row_group_size]
+
+    def _flush(self, rows):
+        chunks = []
+        for values in zip(*rows):
+            blob, kind = _encode(list(values))
+            chunks.append([self._fh.tell(), len(blob), kind])
+            self._fh.write(blob)
+        self._groups.append({'rows': len(rows), 'chunks': chunks})
+        self.num_rows += len(rows)
+
+    def close(self):
+        if self._pending:
+            self._flush(self._pending)
+            self._pending = []
+        footer = json.dumps({'columns': self.columns, 'num_rows': self.num_rows,
+                             'row_groups': self._groups}).encode('utf-8')
+        self._fh.write(footer)
+        self._fh.write(_TRAILER.pack(len(footer)))
+        self._fh.write(MAGIC)
+        self._fh.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._fh.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+
+class ColumnarReader:
+    """
+    Reads a file written by ColumnarWriter: row ranges and column subsets
+    decode only the row groups and column chunks they touch.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fh:
+            fh.seek(-(_TRAILER.size + len(MAGIC)), os.SEEK_END)
+            size_bytes = fh.read(_TRAILER.size)
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a columnar report artifact")
+            (footer_size,) = _TRAILER.unpack(size_bytes)
+            fh.seek(-(_TRAILER.size + len(MAGIC) + footer_size), os.SEEK_END)
+            footer = json.loads(fh.read(footer_size))
+        self.columns = footer['columns']
+        self.num_rows = footer['num_rows']
+        self._groups = footer['row_groups']
+
+    def _indexes(self, columns):
+        if columns is None:
+            return list(range(len(self.columns)))
+        positions = {name: i for i, name in enumerate(self.columns)}
+        return [positions[name] for name in columns]
+
+    def _read_group(self, fh, group, indexes):
+        values = []
+        for i in indexes:
+            offset, length, kind = group['chunks'][i]
+            fh.seek(offset)
+            values.append(_decode(fh.read(length), kind))
+        return list(zip(*values))
+
+    def read(self, offset, limit, columns=None):
+        """
+        Rows [offset, offset + limit) as tuples of the requested columns.
+        """
+        indexes = self._indexes(columns)
+        rows = []
+        start = 0
+        with open(self.path, 'rb') as fh:
+            for group in self._groups:
+                end = start + group['rows']
+                if end > offset and start < offset + limit:
+                    group_rows = self._read_group(fh, group, indexes)
+                    rows.extend(group_rows[max(offset - start, 0):offset + limit - start])
+                start = end
+                if start >= offset + limit:
+                    break
+        return rows
+
+    def iter_batches(self, columns=None):
+        """
+        Yield the rows one row group at a time, for streaming exports.
+        """
+        indexes = self._indexes(columns)
+        with open(self.path, 'rb') as fh:
+            for group in self._groups:
+                yield self._read_group(fh, group, indexes)
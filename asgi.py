@@ -0,0 +1,24 @@
+"""
+ASGI entry point.
+
+    uvicorn asgi:asgi_app --workers 2
+
+Each request runs the Flask view on a thread pool of ASGI_THREADS threads
+(default 16) owned by the WSGI adapter, so dropdown lookups, report pages and
+heavy summaries are served concurrently by one worker process. The per-group
+limits in app.py (ROUTE_LIMITS) keep the heavy routes from taking every thread:
+over-limit requests get a 503 straight away, and together the limits must
+leave threads free for logins and dropdowns.
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import app, route_limiter
+
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', 16))
+if route_limiter.total() >= ASGI_THREADS:
+    raise ValueError(f"ROUTE_LIMITS allow {route_limiter.total()} concurrent requests but ASGI_THREADS is "
+                     f"{ASGI_THREADS}; keep the limits below the thread count so unlimited routes get a thread")
+
+asgi_app = WSGIMiddleware(app, workers=ASGI_THREADS)
@@ -0,0 +1,89 @@
+"""
+Chart input-preparation micro-benchmark.
+
+Compares the old per-chart pandas path (a DataFrame per metric plus two
+fillna calls) with chart_columns() built once per request and shared by all
+four charts. Optionally times the full matplotlib render as well.
+
+    python bench_charts.py --groups 50 --repeat 200
+    python bench_charts.py --render
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from chart import chart_columns, render_summary_chart
+
+METRICS = ["Total_Records", "Total_Gas_Charges", "Total_Net_Bill", "Total_SCM_Consumed"]
+
+
+def synthetic_rows(groups):
+    rows = []
+    for i in range(groups):
+        rows.append({
+            'group_name': None if i % 17 == 0 else f"Region {i}",
+            'Total_Records': random.randint(0, 50000),
+            'Total_Gas_Charges': Decimal(random.randint(0, 10 ** 9)) / 100,
+            'Total_Net_Bill': None if i % 11 == 0 else Decimal(random.randint(0, 10 ** 9)) / 100,
+            'Total_SCM_Consumed': Decimal(random.randint(0, 10 ** 7)) / 100,
+        })
+    return rows
+
+
+def pandas_prepare(rows):
+    import pandas as pd
+    for metric in METRICS:
+        df = pd.DataFrame(rows)
+        df['group_name'].fillna('Unknown')
+        df[metric].fillna(0)
+
+
+def columns_prepare(rows):
+    columns = chart_columns(rows, METRICS)
+    for metric in METRICS:
+        columns['groups'], columns['metrics'][metric]
+
+
+def timed(fn, rows, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(rows)
+    return (time.perf_counter() - start) / repeat / len(METRICS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-chart preparation overhead')
+    parser.add_argument('--groups', type=int, default=50, help='rows (groups) per chart')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--render', action='store_true', help='also time a full PNG render')
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.groups)
+    print(f"{args.groups} groups, {len(METRICS)} charts per request, {args.repeat} requests")
+
+    after = timed(columns_prepare, rows, args.repeat)
+    try:
+        before = timed(pandas_prepare, rows, args.repeat)
+    except ImportError:
+        before = None
+
+    if before is not None:
+        print(f"  pandas DataFrame per chart : {before * 1e6:10.1f} us/chart")
+    else:
+        print("  pandas DataFrame per chart :  (pandas not installed)")
+    print(f"  shared chart_columns()     : {after * 1e6:10.1f} us/chart")
+    if before:
+        print(f"  speed-up                   : {before / after:10.1f}x")
+
+    if args.render:
+        columns = chart_columns(rows, METRICS)
+        render_summary_chart(columns, metric=METRICS[0])  # first call pays for the imports
+        start = time.perf_counter()
+        for metric in METRICS:
+            render_summary_chart(columns, metric=metric)
+        print(f"  full PNG render            : {(time.perf_counter() - start) / len(METRICS) * 1e3:10.1f} ms/chart")
+
+
+if __name__ == '__main__':
+    main()
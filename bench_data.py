@@ -0,0 +1,189 @@
+"""
+Synthetic data generator for benchmarks.
+
+Creates ssgc_reports and one ngrlng_sale_YYYYMM table per month in the
+database named by DB_HOST / DB_USER / DB_PASS / DB_NAME, with a Unit -> Region
+-> Zone -> SubZone -> Area fan-out. Output is deterministic for a given seed,
+so runs on different commits see identical data.
+
+    python bench_data.py --sales-rows 10000                       # smoke size
+    python bench_data.py --sales-rows 5000000 --months 202504 202505 202506
+    python bench_data.py --sales-rows 50000000 --fanout 4 6 6 6 8 --drop
+
+Use a throwaway database: --drop removes existing benchmark tables first.
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+from dotenv import load_dotenv
+
+ACTIVITY_TYPES = ['Meter Change', 'Disconnection', 'Reconnection', 'Inspection', 'Leak Repair', 'Bill Dispute']
+STATUSES = ['Open', 'Closed', 'Pending', 'Cancelled']
+CUST_CLASSES = [('DOM', 70), ('COM', 18), ('IND', 7), ('BULK', 3), ('GOV', 2)]
+
+SALES_NUMERIC_COLUMNS = [
+    'Gas_Charges', 'Meter_Rent', 'GST', 'Total_SCM', 'Total_MMBTU', 'Less_Prov_Bills', 'Arrears',
+    'Total_Cur_Bill', 'Total_Net_Bill', 'LPS_Charged', 'LPS', 'Debit_Dr', 'Credit_Cr', 'Last_Payment',
+    'Misc_Adj', 'Others_Adj', 'Other_Amt', 'Other_CM', 'Other_MMBTU', 'Op_Bal', 'Cl_Bal', 'WoglamtCM',
+    'WoglamtMMBTU', 'NP_Fixed_Charges', 'P_Fixed_Charges', 'Levy_Charges', 'Levy_Adj', 'NP_Fix_Adj', 'P_Fix_Adj',
+]
+
+REPORTS_DDL = """
+    CREATE TABLE IF NOT EXISTS ssgc_reports (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        Account_ID VARCHAR(20),
+        Unit_Cd VARCHAR(10), Unit_Descr VARCHAR(100),
+        Region_Cd VARCHAR(10), Region_Descr VARCHAR(100),
+        Zone_Cd VARCHAR(10), Zone_Descr VARCHAR(100),
+        SubZone_Cd VARCHAR(10), SubZone_Descr VARCHAR(100),
+        Area_Cd VARCHAR(10), Area_Descr VARCHAR(100),
+        Activity_Type VARCHAR(50),
+        FA_Status VARCHAR(20),
+        Activity_Date DATE,
+        Description VARCHAR(255)
+    )
+"""
+
+
+def sales_ddl(table):
+    numeric = ',\n        '.join(f"{col} DECIMAL(14, 2)" for col in SALES_NUMERIC_COLUMNS)
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        Billing_Month VARCHAR(6) NOT NULL,
+        Cust_Cl_Cd VARCHAR(10),
+        AREA VARCHAR(10) NOT NULL,
+        {numeric}
+    )
+    """
+
+
+def build_hierarchy(fanout):
+    """
+    Every (unit, region, zone, subzone, area) path as a dict of codes and descriptions.
+    """
+    units, regions, zones, subzones, areas = fanout
+    paths = []
+    for u in range(units):
+        for r in range(regions):
+            for z in range(zones):
+                for sz in range(subzones):
+                    for a in range(areas):
+                        paths.append({
+                            'Unit_Cd': f"U{u}", 'Unit_Descr': f"Unit {u}",
+                            'Region_Cd': f"R{u}{r}", 'Region_Descr': f"Region {u}-{r}",
+                            'Zone_Cd': f"Z{u}{r}{z}", 'Zone_Descr': f"Zone {u}-{r}-{z}",
+                            'SubZone_Cd': f"S{u}{r}{z}{sz}", 'SubZone_Descr': f"Sub Zone {u}-{r}-{z}-{sz}",
+                            'Area_Cd': f"A{u}{r}{z}{sz}{a}", 'Area_Descr': f"Area {u}-{r}-{z}-{sz}-{a}",
+                        })
+    return paths
+
+
+def insert_batches(conn, sql, rows, batch_size):
+    cursor = conn.cursor()
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            cursor.executemany(sql, batch)
+            conn.commit()
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+        conn.commit()
+    cursor.close()
+
+
+def report_rows(rng, paths, per_area):
+    start = date(2024, 1, 1)
+    account = 100000
+    for path in paths:
+        for _ in range(per_area):
+            account += rng.randint(1, 50)
+            yield (
+                str(account),
+                path['Unit_Cd'], path['Unit_Descr'], path['Region_Cd'], path['Region_Descr'],
+                path['Zone_Cd'], path['Zone_Descr'], path['SubZone_Cd'], path['SubZone_Descr'],
+                path['Area_Cd'], path['Area_Descr'],
+                rng.choice(ACTIVITY_TYPES), rng.choice(STATUSES),
+                start + timedelta(days=rng.randint(0, 540)),
+                f"Field activity {account}",
+            )
+
+
+def sales_rows(rng, month, areas, count):
+    # Skewed area sizes: a few busy areas, a long tail of small ones
+    area_weights = list(itertools.accumulate(1.0 / (1 + i % 37) for i in range(len(areas))))
+    classes, weights = zip(*CUST_CLASSES)
+    class_weights = list(itertools.accumulate(weights))
+    for _ in range(count):
+        area = rng.choices(areas, cum_weights=area_weights)[0]
+        scm = rng.uniform(5, 400)
+        gas = scm * rng.uniform(100, 130)
+        row = {col: round(rng.uniform(0, 500), 2) for col in SALES_NUMERIC_COLUMNS}
+        row.update({
+            'Total_SCM': round(scm, 2), 'Total_MMBTU': round(scm * 0.0375, 2),
+            'Gas_Charges': round(gas, 2), 'GST': round(gas * 0.17, 2),
+            'Total_Cur_Bill': round(gas * 1.2, 2), 'Total_Net_Bill': round(gas * 1.25, 2),
+        })
+        yield (month, rng.choices(classes, cum_weights=class_weights)[0], area) + tuple(row[col] for col in SALES_NUMERIC_COLUMNS)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Generate synthetic SSGC reporting data')
+    parser.add_argument('--sales-rows', type=int, default=10000, help='sales rows per month')
+    parser.add_argument('--months', nargs='+', default=['202506'], help='billing months (YYYYMM)')
+    parser.add_argument('--fanout', nargs=5, type=int, default=[3, 4, 4, 4, 5], metavar='N',
+                        help='children per level: units regions zones subzones areas')
+    parser.add_argument('--reports-per-area', type=int, default=2)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--drop', action='store_true', help='drop existing benchmark tables first')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conn = mysql.connector.connect(host=os.getenv('DB_HOST'), user=os.getenv('DB_USER'),
+                                   password=os.getenv('DB_PASS'), database=os.getenv('DB_NAME'))
+    cursor = conn.cursor()
+    tables = ['ssgc_reports'] + [f"ngrlng_sale_{month}" for month in args.months]
+    if args.drop:
+        for table in tables:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(REPORTS_DDL)
+    for month in args.months:
+        cursor.execute(sales_ddl(f"ngrlng_sale_{month}"))
+    cursor.close()
+
+    paths = build_hierarchy(args.fanout)
+    areas = [path['Area_Cd'] for path in paths]
+    print(f"{len(paths)} areas, {len(paths) * args.reports_per_area} report rows, "
+          f"{args.sales_rows} sales rows x {len(args.months)} months")
+
+    started = time.perf_counter()
+    insert_batches(conn, """
+        INSERT INTO ssgc_reports (Account_ID, Unit_Cd, Unit_Descr, Region_Cd, Region_Descr, Zone_Cd, Zone_Descr,
+                                  SubZone_Cd, SubZone_Descr, Area_Cd, Area_Descr, Activity_Type, FA_Status,
+                                  Activity_Date, Description)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, report_rows(rng, paths, args.reports_per_area), args.batch_size)
+
+    columns = ['Billing_Month', 'Cust_Cl_Cd', 'AREA'] + SALES_NUMERIC_COLUMNS
+    for month in args.months:
+        table = f"ngrlng_sale_{month}"
+        insert_batches(conn, f"INSERT INTO {table} ({', '.join(columns)}) "
+                             f"VALUES ({', '.join(['%s'] * len(columns))})",
+                       sales_rows(rng, month, areas, args.sales_rows), args.batch_size)
+        print(f"  {table}: {args.sales_rows} rows ({time.perf_counter() - started:.1f}s elapsed)")
+
+    conn.close()
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Import-time benchmark.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+reports the cumulative import cost per top-level package, so that a heavy
+dependency creeping back into worker start-up is easy to spot.
+
+    python bench_imports.py                 # app
+    python bench_imports.py app chart --top 15
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def import_times(module):
+    """
+    {top-level package: (self microseconds, cumulative microseconds)} for a
+    cold import of `module`. Self time is attributed to exactly one package,
+    so it sums to the total; cumulative includes everything a package pulled in.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        last = proc.stderr.strip().splitlines()[-1:] or ['unknown error']
+        raise RuntimeError(f"import {module} failed: {last[0]}")
+
+    totals = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative, _, name = match.groups()
+        top = name.split('.')[0]
+        own, cum = totals.get(top, (0, 0))
+        # The package's own top-level entry carries its cumulative cost
+        totals[top] = (own + int(self_us), max(cum, int(cumulative)) if name != top else int(cumulative))
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report import cost per module')
+    parser.add_argument('modules', nargs='*', default=['app'])
+    parser.add_argument('--top', type=int, default=20, help='rows to show per module')
+    args = parser.parse_args()
+
+    for module in args.modules:
+        totals = import_times(module)
+        total = sum(own for own, _ in totals.values())
+        print(f"import {module}: {total / 1000:.1f} ms")
+        print(f"  {'package':<30} {'self':>9}     {'cumulative':>12}")
+        for name, (own, cum) in sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:args.top]:
+            print(f"  {name:<30} {own / 1000:9.1f} ms  {cum / 1000:9.1f} ms  {own * 100 / total if total else 0:5.1f}%")
+        print()
+
+
+if __name__ == '__main__':
+    main()
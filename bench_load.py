@@ -0,0 +1,213 @@
+"""
+Concurrent load test for the reporting routes.
+
+Each simulated user runs the scripted session a few times against a running
+server (pair it with data from bench_data.py):
+
+    login -> billing months / classes -> dropdown cascade -> generate_report
+          -> page through report_results -> summary_report group-by switches
+          -> chart_view (+ /chart_data)
+
+and the report gives p50/p95/p99 latency, error count and throughput per
+route. Use --json to save the run (with the current commit) for comparison.
+
+    python bench_load.py --base-url http://127.0.0.1:5000 --users 8 --iterations 5
+    python bench_load.py --users 32 --duration 120 --json runs/$(git rev-parse --short HEAD).json
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import random
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+GROUP_BYS = ['Unit_Descr', 'Region_Descr', 'Zone_Descr', 'Area_Descr']
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}  # route -> [seconds]
+        self.errors = {}
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(route, []).append(seconds)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Session:
+    """
+    One simulated user with its own cookie jar. Redirects are not followed,
+    so every route is timed on its own.
+    """
+
+    def __init__(self, base_url, recorder, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+
+    def call(self, route, path, params=None, data=None):
+        url = self.base_url + path
+        if params:
+            url += '?' + urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        started = time.perf_counter()
+        status, payload = None, b''
+        try:
+            with self.opener.open(url, data=body, timeout=self.timeout) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except (urllib.error.URLError, OSError):
+            status = None
+        elapsed = time.perf_counter() - started
+        self.recorder.record(route, elapsed, status is not None and status < 400)
+        return status, payload
+
+    def json(self, route, path, params=None):
+        status, payload = self.call(route, path, params)
+        try:
+            return json.loads(payload) if status == 200 else None
+        except ValueError:
+            return None
+
+
+def run_session(session, rng, pages):
+    session.call('login', '/login', data={'username': 'admin', 'password': '123'})
+
+    months = session.json('get_billing_months', '/get_billing_months') or []
+    months = [m.get('Billing_Month') for m in months if isinstance(m, dict) and m.get('Billing_Month')]
+    if not months:
+        return
+    month = rng.choice(months)
+
+    classes = session.json('get_cust_classes', '/get_cust_classes', {'billing_month': month}) or []
+    classes = [c.get('Cust_Cl_Cd') for c in classes if isinstance(c, dict)]
+    cust_cl_cd = rng.choice(classes) if classes and rng.random() < 0.5 else None
+
+    # Dropdown cascade: whole tree once, then the per-level lookups a user walks through
+    session.json('get_hierarchy', '/get_hierarchy', {'billing_month': month, 'cust_cl_cd': cust_cl_cd})
+    filters = {'billing_month': month, 'cust_cl_cd': cust_cl_cd}
+    base = {'billing_month': month, 'cust_cl_cd': cust_cl_cd}
+    for route, parent, key in [('get_units', None, 'unit'), ('get_regions', 'unit', 'region'),
+                               ('get_zones', 'region', 'zone')]:
+        params = dict(base)
+        if parent:
+            if not filters.get(parent):
+                break
+            params[parent] = filters[parent]
+        options = session.json(route, '/' + route, params) or []
+        codes = [o.get(f'{key.capitalize()}_Cd') for o in options if isinstance(o, dict)]
+        codes = [c for c in codes if c]
+        # Narrow the report down the hierarchy some of the time
+        if codes and rng.random() < 0.4:
+            filters[key] = rng.choice(codes)
+        else:
+            break
+
+    session.call('generate_report', '/generate_report',
+                 data={k: v or '' for k, v in filters.items()})
+    for page in range(1, pages + 1):
+        session.call('report_results', '/report_results', {'page': page, 'per_page': 50})
+
+    for group_by in rng.sample(GROUP_BYS, k=3):
+        session.call('summary_report', '/summary_report', {'group_by': group_by})
+
+    group_by = rng.choice(GROUP_BYS)
+    session.call('chart_view', '/chart_view', {'group_by': group_by})
+    session.call('chart_data', '/chart_data', {'group_by': group_by})
+
+
+def user_loop(user, args, recorder, deadline):
+    rng = random.Random(args.seed + user)
+    session = Session(args.base_url, recorder, args.timeout)
+    iteration = 0
+    while iteration < args.iterations or (deadline and time.monotonic() < deadline):
+        if deadline and time.monotonic() >= deadline:
+            break
+        run_session(session, rng, args.pages)
+        iteration += 1
+
+
+def summarize(recorder, wall):
+    rows = {}
+    for route, samples in sorted(recorder.samples.items()):
+        values = sorted(samples)
+        rows[route] = {
+            'count': len(values),
+            'errors': recorder.errors.get(route, 0),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'max_ms': round(values[-1] * 1000, 2),
+            'rps': round(len(values) / wall, 2) if wall else 0.0,
+        }
+    return rows
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the SSGC reporting routes')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--users', type=int, default=8, help='concurrent simulated users')
+    parser.add_argument('--iterations', type=int, default=3, help='sessions per user')
+    parser.add_argument('--duration', type=float, default=0, help='keep going for this many seconds')
+    parser.add_argument('--pages', type=int, default=3, help='report pages visited per session')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        for future in [pool.submit(user_loop, user, args, recorder, deadline) for user in range(args.users)]:
+            future.result()
+    wall = time.perf_counter() - started
+
+    rows = summarize(recorder, wall)
+    total = sum(row['count'] for row in rows.values())
+    print(f"{args.users} users, {wall:.1f}s, {total} requests, {total / wall if wall else 0:.1f} req/s")
+    print(f"{'route':<20} {'count':>7} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'req/s':>7}")
+    for route, row in rows.items():
+        print(f"{route:<20} {row['count']:>7} {row['errors']:>5} {row['p50_ms']:>9} {row['p95_ms']:>9} "
+              f"{row['p99_ms']:>9} {row['max_ms']:>9} {row['rps']:>7}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'commit': current_commit(), 'args': vars(args), 'wall_seconds': round(wall, 3),
+                       'routes': rows}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
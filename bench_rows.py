@@ -0,0 +1,111 @@
+"""
+Report page row-handling micro-benchmark.
+
+Compares the dict-per-row path (what a dictionary cursor builds, with each
+cell looked up by name and blanked with `or ''` at render time) against tuple
+rows turned into display strings column by column with format_rows(). Uses a synthetic report_results page
+of the given size; --jinja also times rendering both forms into a table.
+
+    python bench_rows.py --rows 500 --repeat 50
+    python bench_rows.py --profile billing --jinja
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from formatting import format_rows
+from profiles import COLUMN_PROFILES
+
+SEEK_COLUMNS = ['_seek_area', '_seek_key']
+
+DICT_TEMPLATE = """{% for item in results %}<tr>{% for name in names %}<td>{{ item[name] or '' }}</td>{% endfor %}</tr>
+{% endfor %}"""
+TUPLE_TEMPLATE = """{% for item in results %}<tr>{% for cell in item %}<td>{{ cell }}</td>{% endfor %}</tr>
+{% endfor %}"""
+
+
+def synthetic_rows(columns, count):
+    """
+    Tuples shaped like the report page query: seek keys, then the profile's columns.
+    """
+    rows = []
+    for i in range(count):
+        row = [f"A{i % 97:04d}", i]
+        for name, alias, _ in columns:
+            if alias == 's' and name not in ('Billing_Month', 'Cust_Cl_Cd'):
+                row.append(None if i % 13 == 0 else Decimal(random.randint(-10 ** 7, 10 ** 9)) / 100)
+            elif name == 'Activity_Date':
+                row.append(date(2024, 1, 1) + timedelta(days=i % 365))
+            elif name == 'Billing_Month':
+                row.append('202401')
+            else:
+                row.append(f"{name} {i % 50}")
+        rows.append(tuple(row))
+    return rows
+
+
+def dict_path(names, rows):
+    # A dictionary cursor builds one dict per row; each cell is looked up and stringified while rendering
+    results = [dict(zip(names, row)) for row in rows]
+    visible = names[len(SEEK_COLUMNS):]
+    return [[str(item[name] or '') for name in visible] for item in results]
+
+
+def tuple_path(names, rows):
+    return format_rows(names, rows, skip=len(SEEK_COLUMNS))
+
+
+def timed(fn, repeat, *args):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-page row conversion and formatting cost')
+    parser.add_argument('--rows', type=int, default=500, help='rows per page')
+    parser.add_argument('--profile', default='full', choices=sorted(COLUMN_PROFILES))
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--jinja', action='store_true', help='also time rendering the table body')
+    args = parser.parse_args()
+
+    columns = COLUMN_PROFILES[args.profile]
+    names = SEEK_COLUMNS + [name for name, _, _ in columns]
+    rows = synthetic_rows(columns, args.rows)
+    print(f"{args.rows} rows x {len(columns)} columns ('{args.profile}' profile), {args.repeat} pages")
+
+    before = timed(dict_path, args.repeat, names, rows)
+    after = timed(tuple_path, args.repeat, names, rows)
+    print(f"  dict rows, per-cell lookups  : {before * 1e3:8.2f} ms/page")
+    print(f"  tuple rows + format_rows()   : {after * 1e3:8.2f} ms/page")
+    print(f"  speed-up                     : {before / after:8.1f}x")
+
+    if args.jinja:
+        try:
+            from jinja2 import Environment
+        except ImportError:
+            print("  (jinja2 not installed, skipping render timing)")
+            return
+        env = Environment(autoescape=True)
+        dict_template = env.from_string(DICT_TEMPLATE)
+        tuple_template = env.from_string(TUPLE_TEMPLATE)
+        visible = names[len(SEEK_COLUMNS):]
+
+        def render_dicts():
+            dict_template.render(results=[dict(zip(names, row)) for row in rows], names=visible)
+
+        def render_tuples():
+            tuple_template.render(results=tuple_path(names, rows))
+
+        before = timed(render_dicts, args.repeat)
+        after = timed(render_tuples, args.repeat)
+        print(f"  render, dict rows            : {before * 1e3:8.2f} ms/page")
+        print(f"  render, pre-formatted tuples : {after * 1e3:8.2f} ms/page")
+        print(f"  speed-up                     : {before / after:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
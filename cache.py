@@ -0,0 +1,339 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    A ttl of None keeps entries until they are evicted or invalidated.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (value, stored_at)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def invalidate(self, predicate):
+        """
+        Drop every entry whose key matches `predicate`. Returns the number removed.
+        """
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class DataVersions:
+    """
+    Tracks a load version per table so caches can key on it.
+
+    The version is whatever `fetch` returns (a value stored in the database,
+    so every worker agrees on it), re-checked at most every `ttl` seconds.
+    invalidate() makes this process re-check on the next get(); other
+    processes pick up the new version within `ttl`.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions = {}  # table -> (fetched version, checked_at)
+
+    def get(self, table, fetch):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._versions.get(table)
+        if cached is None or now - cached[1] >= self.ttl:
+            version = fetch()
+            with self._lock:
+                self._versions[table] = (version, now)
+        else:
+            version = cached[0]
+        return version
+
+    def invalidate(self, table):
+        with self._lock:
+            self._versions.pop(table, None)
+
+
+def cache_key(*parts):
+    """
+    Stable string key for a result cache entry (query shape, filters, page, ...).
+    """
+    payload = json.dumps(parts, default=str, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ByteLRUCache:
+    """
+    In-process LRU of pickled values bounded by their total size in bytes.
+
+    Values are stored pickled, so callers get their own copy and the bound
+    reflects real memory use. Each entry carries a tag (e.g. the source table)
+    so everything derived from one table can be dropped at once.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (blob, tag, stored_at)
+        self._bytes = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            blob, _, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at >= self.ttl:
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+        return blob
+
+    def set(self, key, blob, tag=None):
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (blob, tag, time.monotonic())
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        blob, _, _ = self._data.pop(key)
+        self._bytes -= len(blob)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            stale = [key for key, (_, entry_tag, _) in self._data.items() if entry_tag == tag]
+            for key in stale:
+                self._remove(key)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+            }
+
+
+class SQLiteCache:
+    """
+    Shared result tier in a local SQLite file, so several workers on one host
+    can reuse each other's results. Each thread gets its own connection.
+    """
+
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    key TEXT PRIMARY KEY,
+                    tag TEXT,
+                    value BLOB NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_tag ON result_cache (tag)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """
+        (blob, tag) for a live entry, or None.
+        """
+        row = self._connect().execute(
+            "SELECT value, tag, stored_at FROM result_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if self.ttl is not None and time.time() - row[2] >= self.ttl:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+            return None
+        return bytes(row[0]), row[1]
+
+    def set(self, key, blob, tag=None):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO result_cache (key, tag, value, stored_at) VALUES (?, ?, ?, ?)",
+                         (key, tag, sqlite3.Binary(blob), time.time()))
+
+    def invalidate_tag(self, tag):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM result_cache WHERE tag = ?", (tag,)).rowcount
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM result_cache")
+
+    def stats(self):
+        entries, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM result_cache").fetchone()
+        return {'path': self.path, 'entries': entries, 'bytes': size}
+
+
+class TieredCache:
+    """
+    Result cache with an in-process ByteLRUCache in front of an optional shared
+    tier (SQLiteCache). Shared hits are promoted to memory; sets write both.
+    Errors from the shared tier are counted and otherwise ignored, since the
+    cache must never take a request down.
+    """
+
+    def __init__(self, memory, shared=None, logger=None):
+        self.memory = memory
+        self.shared = shared
+        self.logger = logger
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+
+    def _shared_failed(self, e):
+        with self._lock:
+            self.shared_errors += 1
+        if self.logger:
+            self.logger.warning(f"Shared result cache error: {e}")
+
+    def get(self, key, default=None):
+        blob, tag = self.memory.get(key), None
+        tier = 'memory'
+        if blob is None and self.shared is not None:
+            try:
+                blob, tag = self.shared.get(key) or (None, None)
+                tier = 'shared'
+            except sqlite3.Error as e:
+                self._shared_failed(e)
+        with self._lock:
+            if blob is None:
+                self.misses += 1
+            elif tier == 'memory':
+                self.memory_hits += 1
+            else:
+                self.shared_hits += 1
+        if blob is None:
+            return default
+        if tier == 'shared':
+            self.memory.set(key, blob, tag)
+        return pickle.loads(blob)
+
+    def set(self, key, value, tag=None):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.memory.set(key, blob, tag)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, blob, tag)
+            except sqlite3.Error as e:
+                self._shared_failed(e)
+
+    def invalidate_tag(self, tag):
+        dropped = self.memory.invalidate_tag(tag)
+        if self.shared is not None:
+            try:
+                dropped += self.shared.invalidate_tag(tag)
+            except sqlite3.Error as e:
+                self._shared_failed(e)
+        return dropped
+
+    def clear(self):
+        self.memory.clear()
+        if self.shared is not None:
+            try:
+                self.shared.clear()
+            except sqlite3.Error as e:
+                self._shared_failed(e)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.shared_hits + self.misses
+            stats = {
+                'memory_hits': self.memory_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+                'shared_errors': self.shared_errors,
+            }
+        stats['memory'] = self.memory.stats()
+        if self.shared is not None:
+            try:
+                stats['shared'] = self.shared.stats()
+            except sqlite3.Error as e:
+                stats['shared'] = {'error': str(e)}
+        return stats
@@ -1,31 +1,74 @@
-import matplotlib
-matplotlib.use("Agg")  # ✅ prevents Tkinter errors, safe for Flask/web
-import matplotlib.pyplot as plt
-from matplotlib.ticker import FuncFormatter
 import io, base64
-import pandas as pd
-import numpy as np
+import threading
 
-def generate_summary_chart(summary_results, group_by="Region_Descr", selected_area=None, chart_type="bar", metric="Total_Records"):
+# numpy/matplotlib are heavy, so they are imported on first chart use (or by preload())
+_deps = None
+_deps_lock = threading.Lock()
+
+def _chart_deps():
+    global _deps
+    if _deps is None:
+        with _deps_lock:
+            if _deps is None:
+                import matplotlib
+                matplotlib.use("Agg")  # ✅ prevents Tkinter errors, safe for Flask/web
+                from matplotlib import cm
+                from matplotlib.figure import Figure
+                from matplotlib.ticker import FuncFormatter
+                import numpy as np
+                _deps = (cm, Figure, FuncFormatter, np)
+    return _deps
+
+def preload(background=True):
     """
-    Generate a summary chart (base64 PNG) from summarised data.
+    Import the chart dependencies ahead of the first chart request.
+    With background=True this runs on a daemon thread and returns it.
+    """
+    if not background:
+        _chart_deps()
+        return None
+    thread = threading.Thread(target=_chart_deps, name='chart-preload', daemon=True)
+    thread.start()
+    return thread
+
+def chart_columns(summary_results, metrics):
+    """
+    Column-oriented form of the chart rows: one list of group names and one
+    numeric list per metric, in the same order. Missing names become 'Unknown'
+    and missing values 0. Build it once per request and share it across metrics.
+    """
+    return {
+        'groups': [row.get('group_name') if row.get('group_name') is not None else 'Unknown'
+                   for row in summary_results],
+        'metrics': {metric: [float(row.get(metric) or 0) for row in summary_results] for metric in metrics},
+    }
+
+def render_summary_chart(summary_results, group_by="Region_Descr", selected_area=None, chart_type="bar", metric="Total_Records"):
+    """
+    Render a summary chart to PNG bytes.
+
+    `summary_results` is either the cursor's dict rows or the output of
+    chart_columns(). Uses a standalone Figure instead of pyplot, so there is
+    no global state and it is safe to call from worker threads or processes.
     """
     if not summary_results:
         return None
 
     try:
-        df = pd.DataFrame(summary_results)
+        if not isinstance(summary_results, dict):
+            summary_results = chart_columns(summary_results, [metric])
+        x_labels = summary_results['groups']
+        y_values = summary_results['metrics'][metric]
 
-        if df.empty:
+        if not x_labels:
             return None
 
+        cm, Figure, FuncFormatter, np = _chart_deps()
+
         # Build chart based on type and metric
-        plt.figure(figsize=(10, 6))
-        
-        # Get the data for the selected metric
-        x_labels = df['group_name'].fillna('Unknown')
-        y_values = df[metric].fillna(0)
-        
+        fig = Figure(figsize=(10, 6))
+        ax = fig.subplots()
+
         # Set chart title based on metric
         metric_titles = {
             "Total_Records": "Total Records",
@@ -33,30 +76,32 @@ def generate_summary_chart(summary_results, group_by="Region_Descr", selected_ar
             "Total_Net_Bill": "Net Bill Amount (Rs.)",
             "Total_SCM_Consumed": "SCM Consumed"
         }
-        
+
         title = f"{metric_titles.get(metric, metric.replace('_', ' ').title())} by {group_by.replace('_Descr','')}"
-        
+
         if chart_type == "pie":
-            plt.pie(y_values, labels=x_labels, autopct='%1.1f%%', startangle=90)
-            plt.title(title)
-            plt.axis('equal')
-            
+            ax.pie(y_values, labels=x_labels, autopct='%1.1f%%', startangle=90)
+            ax.set_title(title)
+            ax.axis('equal')
+
         elif chart_type == "line":
-            plt.plot(range(len(x_labels)), y_values, marker='o', linewidth=2, markersize=8)
-            plt.title(title)
-            plt.xlabel(group_by.replace('_Descr', ''))
-            plt.ylabel(metric_titles.get(metric, metric.replace('_', ' ').title()))
-            plt.xticks(range(len(x_labels)), x_labels, rotation=45, ha='right')
-            plt.grid(True, alpha=0.3)
-            
+            ax.plot(range(len(x_labels)), y_values, marker='o', linewidth=2, markersize=8)
+            ax.set_title(title)
+            ax.set_xlabel(group_by.replace('_Descr', ''))
+            ax.set_ylabel(metric_titles.get(metric, metric.replace('_', ' ').title()))
+            ax.set_xticks(range(len(x_labels)))
+            ax.set_xticklabels(x_labels, rotation=45, ha='right')
+            ax.grid(True, alpha=0.3)
+
         else:
             # Bar chart (default)
-            bars = plt.bar(range(len(x_labels)), y_values, color=plt.cm.Set3(np.arange(len(x_labels))))
-            plt.title(title)
-            plt.xlabel(group_by.replace('_Descr', ''))
-            plt.ylabel(metric_titles.get(metric, metric.replace('_', ' ').title()))
-            plt.xticks(range(len(x_labels)), x_labels, rotation=45, ha='right')
-            
+            bars = ax.bar(range(len(x_labels)), y_values, color=cm.Set3(np.arange(len(x_labels))))
+            ax.set_title(title)
+            ax.set_xlabel(group_by.replace('_Descr', ''))
+            ax.set_ylabel(metric_titles.get(metric, metric.replace('_', ' ').title()))
+            ax.set_xticks(range(len(x_labels)))
+            ax.set_xticklabels(x_labels, rotation=45, ha='right')
+
             # Add value labels on bars
             for i, (bar, value) in enumerate(zip(bars, y_values)):
                 if "Charges" in metric or "Bill" in metric:
@@ -65,26 +110,32 @@ def generate_summary_chart(summary_results, group_by="Region_Descr", selected_ar
                 else:
                     # Format numeric values
                     formatted_value = f"{int(value):,}"
-                
-                plt.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 0.05,
+
+                ax.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 0.05,
                         formatted_value, ha='center', va='bottom', fontsize=9)
 
         # Format y-axis for currency values
         if "Charges" in metric or "Bill" in metric:
-            plt.gca().yaxis.set_major_formatter(FuncFormatter(lambda x, p: f"Rs. {int(x):,}"))
+            ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f"Rs. {int(x):,}"))
         else:
-            plt.gca().yaxis.set_major_formatter(FuncFormatter(lambda x, p: format(int(x), ',')))
+            ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: format(int(x), ',')))
 
-        # Save to base64
+        # Save to PNG
         buf = io.BytesIO()
-        plt.tight_layout()
-        plt.savefig(buf, format="png", dpi=100, bbox_inches='tight')
-        buf.seek(0)
-        chart_data = base64.b64encode(buf.getvalue()).decode("utf-8")
-        plt.close()
-
-        return chart_data
-        
+        fig.tight_layout()
+        fig.savefig(buf, format="png", dpi=100, bbox_inches='tight')
+        return buf.getvalue()
+
     except Exception as e:
         print(f"Error generating chart: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def generate_summary_chart(summary_results, group_by="Region_Descr", selected_area=None, chart_type="bar", metric="Total_Records"):
+    """
+    Generate a summary chart (base64 PNG) from summarised data.
+    """
+    png = render_summary_chart(summary_results, group_by=group_by, selected_area=selected_area,
+                               chart_type=chart_type, metric=metric)
+    if png is None:
+        return None
+    return base64.b64encode(png).decode("utf-8")
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from cache import TTLCache
+from chart import chart_columns, preload, render_summary_chart
+
+
+def chart_key(filters_key, group_by, chart_type, metric, selected_area, data_version):
+    """
+    Stable cache key for one rendered chart image.
+    """
+    payload = json.dumps([filters_key, group_by, chart_type, metric, selected_area, data_version],
+                         default=str, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ChartRenderer:
+    """
+    Renders chart PNGs on a process pool and caches the bytes by chart_key().
+
+    The pool is started on first use with the 'spawn' start method, so worker
+    processes don't inherit the web server's threads and open connections. If
+    a process pool can't be started, breaks, or can't pickle the chart data,
+    rendering falls back to a thread pool for good; the Figure-based renderer
+    is thread-safe. Other failures (a timeout, a chart that fails to render)
+    are retried in-thread for that call only, and the pool is kept or
+    recreated on next use.
+    """
+
+    def __init__(self, processes=2, cache_size=256, ttl=3600, timeout=60, logger=None):
+        self.processes = processes
+        self.timeout = timeout
+        self.logger = logger
+        self.cache = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                if self.processes > 0:
+                    try:
+                        self._pool = ProcessPoolExecutor(max_workers=self.processes,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                    except (OSError, ValueError) as e:
+                        if self.logger:
+                            self.logger.warning(f"Chart process pool unavailable, using threads: {e}")
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=max(self.processes, 1),
+                                                    thread_name_prefix='chart-render')
+            return self._pool
+
+    def _reset_pool(self, disable=False):
+        """
+        Drop the current pool so the next call starts a fresh one; with
+        disable=True that will be a thread pool from then on.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+            if disable:
+                self.processes = 0
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def warm(self):
+        """
+        Import the chart dependencies in this process and in every pool worker,
+        so the first chart request doesn't pay for the numpy/matplotlib imports.
+        """
+        try:
+            preload(background=False)
+            pool = self._executor()
+            for future in [pool.submit(preload, False) for _ in range(max(self.processes, 1))]:
+                future.result(timeout=self.timeout)
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"Chart preload failed: {e}")
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def render_many(self, chart_results, group_by, selected_area, chart_type, keys):
+        """
+        Make sure a PNG is cached for every metric in `keys` ({metric: cache key}),
+        rendering the missing ones in parallel. Returns {metric: key}, with None
+        for charts that could not be rendered.
+        """
+        keys = dict(keys)
+        missing = [metric for metric, key in keys.items() if self.cache.get(key) is None]
+        if not missing:
+            return keys
+
+        # Convert the rows once and ship only the compact columns to the workers
+        chart_results = chart_columns(chart_results, missing)
+        rendered = {}
+        try:
+            pool = self._executor()
+            futures = {
+                metric: pool.submit(render_summary_chart, chart_results, group_by, selected_area, chart_type, metric)
+                for metric in missing
+            }
+            for metric, future in futures.items():
+                rendered[metric] = future.result(timeout=self.timeout)
+        except (BrokenProcessPool, pickle.PicklingError) as e:
+            # The process pool can't work here at all: use threads from now on
+            if self.logger:
+                self.logger.error(f"Chart process pool unusable, switching to threads: {e}")
+            self._reset_pool(disable=True)
+        except FutureTimeoutError:
+            # A stuck worker would hold a pool slot, so start a fresh pool on next use
+            if self.logger:
+                self.logger.error(f"Chart rendering timed out after {self.timeout}s, rendering in-thread")
+            self._reset_pool()
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Chart pool render failed, retrying in-thread: {e}")
+
+        for metric in missing:
+            if metric not in rendered:
+                rendered[metric] = render_summary_chart(chart_results, group_by, selected_area, chart_type, metric)
+
+        for metric, png in rendered.items():
+            if png:
+                self.cache.set(keys[metric], png)
+            else:
+                keys[metric] = None
+        return keys
+
+    def render_one(self, chart_results, group_by, selected_area, chart_type, metric, key):
+        return self.get(self.render_many(chart_results, group_by, selected_area, chart_type, {metric: key})[metric])
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
@@ -0,0 +1,405 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+# Server error for statements that can't be prepared (ER_UNSUPPORTED_PS)
+ER_UNSUPPORTED_PS = 1295
+
+
+def normalize_sql(sql):
+    """
+    Collapse whitespace so the same query shape always maps to one cache key.
+    """
+    return ' '.join(sql.split())
+
+
+class StatementCache:
+    """
+    Prepared-statement cursors for one connection, least recently used first.
+    Only ever touched by the thread that has the connection borrowed.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._cursors = OrderedDict()
+
+    def get(self, key):
+        """
+        (cursor, sql) for a cached statement, or (None, key). Re-running the
+        cursor with the very same sql object lets it skip re-preparing.
+        """
+        entry = self._cursors.get(key)
+        if entry is None:
+            return None, key
+        self._cursors.move_to_end(key)
+        return entry
+
+    def put(self, key, cursor):
+        """
+        Store a cursor; returns how many were evicted to make room.
+        """
+        self._cursors[key] = (cursor, key)
+        evicted = 0
+        while len(self._cursors) > self.size:
+            _, (old, _) = self._cursors.popitem(last=False)
+            self._close(old)
+            evicted += 1
+        return evicted
+
+    def _close(self, cursor):
+        try:
+            cursor.close()
+        except Error:
+            pass
+
+    def close(self):
+        for cursor, _ in self._cursors.values():
+            self._close(cursor)
+        self._cursors.clear()
+
+
+class TimedCursor:
+    """
+    Cursor wrapper that reports how long each execute and fetch took to the
+    pool's query observer. Everything else is passed through untouched.
+    """
+
+    def __init__(self, cursor, observer, name=None):
+        self._cursor = cursor
+        self._observer = observer
+        self._name = name
+        self._sql = None
+        self._params = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+    def _timed(self, phase, call, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            self._observer(self._name, phase, time.perf_counter() - started, self._sql, self._params)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._sql, self._params = operation, params
+        return self._timed('execute', lambda: self._cursor.execute(operation, params, *args, **kwargs))
+
+    def fetchone(self):
+        return self._timed('fetch', self._cursor.fetchone)
+
+    def fetchmany(self, size=1):
+        return self._timed('fetch', self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._timed('fetch', self._cursor.fetchall)
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a MySQL connection borrowed from a ConnectionPool.
+    Behaves like the raw connection, except close() hands it back to the pool.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise Error("Connection has already been returned to the pool")
+        return getattr(raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def cursor(self, *args, name=None, **kwargs):
+        raw = self._raw
+        if raw is None:
+            raise Error("Connection has already been returned to the pool")
+        cursor = raw.cursor(*args, **kwargs)
+        observer = self._pool.query_observer
+        return TimedCursor(cursor, observer, name) if observer else cursor
+
+    def query(self, sql, params=(), dictionary=True, name=None):
+        """
+        Run a read query through this connection's prepared statement cache
+        and return every row (as dicts unless dictionary=False). `name` labels
+        the query in the pool's timing observer.
+        """
+        raw = self._raw
+        if raw is None:
+            raise Error("Connection has already been returned to the pool")
+        observer = self._pool.query_observer
+        if observer is None:
+            return self._pool._run_prepared(raw, sql, params, dictionary)
+        started = time.perf_counter()
+        try:
+            return self._pool._run_prepared(raw, sql, params, dictionary)
+        finally:
+            observer(name, 'query', time.perf_counter() - started, sql, params)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections shared by every route.
+
+    Connections are opened lazily up to `size`. Borrowers wait up to `timeout`
+    seconds for a free connection before PoolError is raised. A connection that
+    has been idle for longer than `validate_after` seconds is pinged before it
+    is handed out and replaced if the server has dropped it.
+
+    Each connection keeps up to `statement_cache_size` server-side prepared
+    statements keyed by normalized SQL, used by PooledConnection.query();
+    0 turns the cache off.
+
+    `query_observer(name, phase, seconds, sql, params)`, if given, is called
+    after every query, execute and fetch made through a borrowed connection.
+    """
+
+    def __init__(self, db_config, size=10, timeout=5.0, validate_after=30.0, statement_cache_size=32,
+                 query_observer=None):
+        self.db_config = dict(db_config)
+        self.size = max(1, int(size))
+        self.timeout = float(timeout)
+        self.validate_after = float(validate_after)
+        self.statement_cache_size = max(0, int(statement_cache_size))
+        self.query_observer = query_observer
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (raw connection, returned_at)
+        self._created = 0
+        self._in_use = 0
+
+        self._borrows = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._stale = 0
+
+        self._statements = {}      # raw connection -> StatementCache
+        self._unpreparable = set()
+        self._stmt_hits = 0
+        self._stmt_misses = 0
+        self._stmt_evictions = 0
+        self._stmt_timing = {}     # sql key -> [miss count, miss time, hit count, hit time]
+
+    def _connect(self):
+        return mysql.connector.connect(**self.db_config)
+
+    def _is_alive(self, raw):
+        try:
+            return raw.is_connected()
+        except Error:
+            return False
+
+    def _discard(self, raw):
+        with self._cond:
+            statements = self._statements.pop(raw, None)
+        if statements is not None:
+            statements.close()
+        try:
+            raw.close()
+        except Error:
+            pass
+
+    def _rows(self, cursor, dictionary):
+        rows = cursor.fetchall()
+        if dictionary and rows and not isinstance(rows[0], dict):
+            columns = cursor.column_names
+            rows = [dict(zip(columns, row)) for row in rows]
+        return rows
+
+    def _run_plain(self, raw, sql, params, dictionary):
+        cursor = raw.cursor(dictionary=dictionary)
+        try:
+            cursor.execute(sql, tuple(params))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _run_prepared(self, raw, sql, params, dictionary):
+        key = normalize_sql(sql)
+        if not self.statement_cache_size or key in self._unpreparable:
+            return self._run_plain(raw, sql, params, dictionary)
+
+        with self._cond:
+            statements = self._statements.get(raw)
+            if statements is None:
+                statements = self._statements[raw] = StatementCache(self.statement_cache_size)
+
+        cursor, key = statements.get(key)
+        hit = cursor is not None
+        if not hit:
+            cursor = raw.cursor(prepared=True)
+
+        started = time.perf_counter()
+        try:
+            # The prepared cursor only re-prepares when the SQL differs from its last run
+            cursor.execute(key, tuple(params))
+            rows = self._rows(cursor, dictionary)
+        except Error as e:
+            if not hit:
+                statements._close(cursor)
+            if getattr(e, 'errno', None) == ER_UNSUPPORTED_PS:
+                with self._cond:
+                    self._unpreparable.add(key)
+                return self._run_plain(raw, sql, params, dictionary)
+            raise
+        elapsed = time.perf_counter() - started
+
+        evicted = 0 if hit else statements.put(key, cursor)
+        with self._cond:
+            timing = self._stmt_timing.setdefault(key, [0, 0.0, 0, 0.0])
+            if hit:
+                self._stmt_hits += 1
+                timing[2] += 1
+                timing[3] += elapsed
+            else:
+                self._stmt_misses += 1
+                self._stmt_evictions += evicted
+                timing[0] += 1
+                timing[1] += elapsed
+        return rows
+
+    def statement_stats(self):
+        """
+        Prepared statement cache counters. Parse time saved is estimated per
+        query shape as hits x (mean first-run time - mean cached-run time).
+        """
+        with self._cond:
+            saved = 0.0
+            for misses, miss_time, hits, hit_time in self._stmt_timing.values():
+                if misses and hits:
+                    saved += hits * max(0.0, miss_time / misses - hit_time / hits)
+            lookups = self._stmt_hits + self._stmt_misses
+            return {
+                'cache_size': self.statement_cache_size,
+                'hits': self._stmt_hits,
+                'misses': self._stmt_misses,
+                'hit_rate': round(self._stmt_hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._stmt_evictions,
+                'prepared': sum(len(cache._cursors) for cache in self._statements.values()),
+                'shapes': len(self._stmt_timing),
+                'unpreparable': len(self._unpreparable),
+                'est_parse_time_saved': round(saved, 4),
+            }
+
+    def get_connection(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        with self._cond:
+            while not self._idle and self._created >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolError(f"Timed out after {timeout:.1f}s waiting for a database connection")
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                elapsed = time.monotonic() - started
+                self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+
+            if self._idle:
+                raw, returned_at = self._idle.pop()
+            else:
+                raw, returned_at = None, None
+                self._created += 1
+            self._in_use += 1
+            self._borrows += 1
+
+        # Network work happens outside the lock so other borrowers aren't blocked
+        try:
+            if raw is not None and time.monotonic() - returned_at > self.validate_after:
+                if not self._is_alive(raw):
+                    self._discard(raw)
+                    with self._cond:
+                        self._stale += 1
+                    raw = None
+            if raw is None:
+                raw = self._connect()
+        except Error:
+            with self._cond:
+                self._created -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, raw)
+
+    def _release(self, raw):
+        healthy = True
+        try:
+            # An abandoned streaming result can't be reused cheaply, so drop the connection
+            if raw.unread_result:
+                healthy = False
+            # Don't leak an open transaction (and its stale snapshot) to the next borrower
+            elif raw.in_transaction:
+                raw.rollback()
+        except Error:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((raw, time.monotonic()))
+            else:
+                self._created -= 1
+            self._cond.notify()
+
+        if not healthy:
+            self._discard(raw)
+
+    def close_all(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._created -= len(idle)
+        for raw, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'created': self._created,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'borrows': self._borrows,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time, 4),
+                'wait_time_avg': round(self._wait_time / self._waits, 4) if self._waits else 0.0,
+                'wait_time_max': round(self._max_wait, 4),
+                'timeouts': self._timeouts,
+                'stale_replaced': self._stale,
+                'statements': self.statement_stats(),
+            }
@@ -0,0 +1,166 @@
+import csv
+import io
+import os
+import tempfile
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def _cell(value):
+    return '' if value is None else value
+
+
+def iter_csv(header, batches):
+    """
+    Yield CSV text chunk by chunk, one chunk per batch of rows.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for rows in batches:
+        writer.writerows([_cell(v) for v in row] for row in rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def write_xlsx(path, header, batches):
+    # openpyxl is optional; write_only mode keeps one row in memory at a time
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Report')
+    ws.append(header)
+    for rows in batches:
+        for row in rows:
+            ws.append(row)
+    wb.save(path)
+
+
+_INTEGER_TYPES = {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint', 'year'}
+
+
+def _arrow_type(pa, column_type):
+    """
+    Arrow type for a MySQL (DATA_TYPE, NUMERIC_PRECISION, NUMERIC_SCALE) triple.
+    """
+    data_type, precision, scale = column_type
+    data_type = (data_type or '').lower()
+    if data_type == 'decimal':
+        precision, scale = int(precision or 38), int(scale or 0)
+        return pa.decimal128(precision, scale) if precision <= 38 else pa.decimal256(precision, scale)
+    if data_type in _INTEGER_TYPES:
+        return pa.int64()
+    if data_type in ('float', 'double', 'real'):
+        return pa.float64()
+    if data_type == 'date':
+        return pa.date32()
+    if data_type in ('datetime', 'timestamp'):
+        return pa.timestamp('us')
+    return pa.string()
+
+
+def _inferred_type(pa, values):
+    # Only for columns the schema lookup didn't cover. DECIMALs get the widest
+    # precision so later batches with bigger values still fit.
+    inferred = pa.array(values).type
+    if pa.types.is_null(inferred):
+        return pa.string()
+    if pa.types.is_decimal(inferred):
+        return pa.decimal128(38, inferred.scale)
+    return inferred
+
+
+def _arrow_column(pa, values, arrow_type):
+    if pa.types.is_string(arrow_type):
+        values = [None if v is None else str(v) for v in values]
+    return pa.array(values, type=arrow_type)
+
+
+def write_parquet(path, header, batches, column_types=None):
+    """
+    Write the batches as one Parquet row group each.
+
+    The schema is fixed up front from `column_types` (one (DATA_TYPE,
+    NUMERIC_PRECISION, NUMERIC_SCALE) per column from information_schema, or
+    None where unknown, in which case the first batch decides). A value that
+    doesn't fit its column raises ValueError instead of leaving a truncated file.
+    """
+    # pyarrow is optional
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    column_types = column_types or [None] * len(header)
+    writer = None
+    try:
+        for rows in batches:
+            values = list(zip(*rows))
+            if writer is None:
+                schema = pa.schema([
+                    (name, _arrow_type(pa, column_type) if column_type else _inferred_type(pa, list(col)))
+                    for name, column_type, col in zip(header, column_types, values)
+                ])
+                writer = pq.ParquetWriter(path, schema)
+            columns = [_arrow_column(pa, list(col), field.type) for col, field in zip(values, writer.schema)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=writer.schema))
+        if writer is None:
+            empty = pa.schema([(name, _arrow_type(pa, column_type) if column_type else pa.string())
+                               for name, column_type in zip(header, column_types)])
+            pq.write_table(empty.empty_table(), path)
+    except pa.ArrowException as e:
+        raise ValueError(f"Parquet export failed: {e}") from e
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def iter_file_export(write, header, batches, suffix, chunk_size=64 * 1024):
+    """
+    Run a file-based writer into a temp file, then return an iterator that
+    streams the file back and deletes it.
+
+    This is buffered, not streamed: XLSX and Parquet need the whole file before
+    it is valid, so the file is written in full before this returns and nothing
+    reaches the client until every batch has been written. A failing writer
+    raises here, before any response has started, so the caller can report the
+    error instead of sending a truncated file. Only iter_csv() streams as the
+    batches arrive.
+    """
+    fd, path = tempfile.mkstemp(suffix='.' + suffix)
+    os.close(fd)
+    try:
+        write(path, header, batches)
+    except BaseException:
+        os.remove(path)
+        raise
+    return _stream_file(path, chunk_size)
+
+
+def _stream_file(path, chunk_size):
+    try:
+        with open(path, 'rb') as fh:
+            while True:
+                chunk = fh.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def format_available(fmt):
+    try:
+        if fmt == 'xlsx':
+            import openpyxl  # noqa: F401
+        elif fmt == 'parquet':
+            import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return fmt in EXPORT_FORMATS
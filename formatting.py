@@ -0,0 +1,48 @@
+NUMBER = "{:,.0f}"
+CURRENCY = "Rs. {:,.2f}"
+DECIMAL = "{:,.2f}"
+
+
+def format_value(value, pattern):
+    """
+    One value through a numeric display pattern; non-numeric values pass through.
+    """
+    try:
+        return pattern.format(float(value))
+    except (ValueError, TypeError):
+        return value
+
+
+def format_column(values, pattern=None, blank=''):
+    """
+    Display strings for one column of values. With a pattern, None becomes
+    `blank` and the rest are formatted as numbers. Without one, cells print as
+    `value or ''` does in a template: empty values (None, '', 0) become `blank`
+    and the rest are str()'d.
+    """
+    if pattern is None:
+        return [str(value) if value else blank for value in values]
+    fmt = pattern.format
+    try:
+        return [blank if value is None else fmt(float(value)) for value in values]
+    except (ValueError, TypeError):
+        # A stray non-numeric cell: fall back to value-by-value formatting
+        return [blank if value is None else str(format_value(value, pattern)) for value in values]
+
+
+def format_rows(column_names, rows, formats=None, blank='', skip=0):
+    """
+    Pre-format tuple rows for display, one column at a time.
+
+    `formats` maps column name -> pattern (NUMBER, CURRENCY, DECIMAL); other
+    columns print as stored. Looking the pattern up once per column and converting
+    a whole column in one comprehension avoids a dict per row and a filter call
+    per cell at render time. The first `skip` columns (e.g. seek keys) are
+    dropped. Returns tuples of strings in the remaining column_names order.
+    """
+    if not rows:
+        return []
+    formats = formats or {}
+    columns = list(zip(*rows))[skip:]
+    return list(zip(*(format_column(values, formats.get(name), blank)
+                      for name, values in zip(column_names[skip:], columns))))
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import threading
+
+LEVEL_NAMES = ['Unit', 'Region', 'Zone', 'SubZone', 'Area']
+
+# Geographic levels from top to bottom: (code column, description column)
+LEVELS = [
+    ('Unit_Cd', 'Unit_Descr'),
+    ('Region_Cd', 'Region_Descr'),
+    ('Zone_Cd', 'Zone_Descr'),
+    ('SubZone_Cd', 'SubZone_Descr'),
+    ('Area_Cd', 'Area_Descr'),
+]
+
+HIERARCHY_QUERY = """
+    SELECT DISTINCT
+        r.Unit_Cd, r.Unit_Descr,
+        r.Region_Cd, r.Region_Descr,
+        r.Zone_Cd, r.Zone_Descr,
+        r.SubZone_Cd, r.SubZone_Descr,
+        r.Area_Cd, r.Area_Descr
+    FROM ssgc_reports r
+    WHERE r.Area_Cd IN (
+        SELECT s.AREA FROM {table} s
+        WHERE s.Billing_Month = %s{cust_filter}
+    )
+"""
+
+
+def hierarchy_query(cust_cl_cd=None, table='ngrlng_sale_202506'):
+    """
+    SQL and params for every Unit..Area combination that has sales in a billing month.
+    """
+    cust_filter = " AND s.Cust_Cl_Cd = %s" if cust_cl_cd else ""
+    return HIERARCHY_QUERY.format(table=table, cust_filter=cust_filter)
+
+
+def _present(value):
+    return value is not None and value != ''
+
+
+class HierarchyTree:
+    """
+    Unit -> Region -> Zone -> SubZone -> Area lookup built from one DISTINCT query.
+
+    Each child level is indexed by its parent's code, mirroring the old per-level
+    queries (e.g. regions for a unit are matched on r.Unit_Cd alone). Results are
+    sorted by description and capped like the original dropdown endpoints.
+    """
+
+    def __init__(self, rows, limit=100):
+        self.limit = limit
+        top_cd, top_descr = LEVELS[0]
+        top = set()
+        children = [dict() for _ in LEVELS[1:]]
+
+        for row in rows:
+            if _present(row[top_cd]) and _present(row[top_descr]):
+                top.add((row[top_cd], row[top_descr]))
+            for i, (cd, descr) in enumerate(LEVELS[1:]):
+                if _present(row[cd]) and _present(row[descr]):
+                    parent = row[LEVELS[i][0]]
+                    children[i].setdefault(parent, set()).add((row[cd], row[descr]))
+
+        self._top = self._as_rows(top, LEVELS[0])
+        self._children = [
+            {parent: self._as_rows(pairs, LEVELS[i + 1]) for parent, pairs in level.items()}
+            for i, level in enumerate(children)
+        ]
+
+        self.compact = self._build_compact(rows)
+        payload = json.dumps(self.compact, sort_keys=True, separators=(',', ':'), default=str)
+        self.etag = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _build_compact(self, rows):
+        """
+        Whole tree as parallel code/descr arrays per level; every level below Unit
+        also has a `parent` array holding the index of its parent in the level above.
+        """
+        paths = set()
+        for row in rows:
+            path = []
+            for cd, descr in LEVELS:
+                if not (_present(row[cd]) and _present(row[descr])):
+                    break
+                path.append((row[cd], row[descr]))
+            for depth in range(1, len(path) + 1):
+                paths.add(tuple(path[:depth]))
+
+        levels = []
+        index_of = {(): None}
+        for depth, name in enumerate(LEVEL_NAMES):
+            nodes = sorted(
+                (p for p in paths if len(p) == depth + 1),
+                key=lambda p: (index_of[p[:-1]] or 0, str(p[-1][1]), str(p[-1][0])),
+            )
+            level = {'name': name, 'code': [], 'descr': []}
+            if depth:
+                level['parent'] = []
+            for i, node in enumerate(nodes):
+                index_of[node] = i
+                level['code'].append(node[-1][0])
+                level['descr'].append(node[-1][1])
+                if depth:
+                    level['parent'].append(index_of[node[:-1]])
+            levels.append(level)
+        return {'levels': levels}
+
+    def _as_rows(self, pairs, level):
+        cd, descr = level
+        ordered = sorted(pairs, key=lambda pair: (str(pair[1]), str(pair[0])))
+        return [{cd: code, descr: name} for code, name in ordered[:self.limit]]
+
+    def children(self, depth, parent=None):
+        """
+        Rows for level `depth` (0 = Unit ... 4 = Area) under the given parent code.
+        """
+        if depth == 0:
+            return self._top
+        return self._children[depth - 1].get(parent, [])
+
+    def units(self):
+        return self.children(0)
+
+    def regions(self, unit_cd):
+        return self.children(1, unit_cd)
+
+    def zones(self, region_cd):
+        return self.children(2, region_cd)
+
+    def subzones(self, zone_cd):
+        return self.children(3, zone_cd)
+
+    def areas(self, subzone_cd):
+        return self.children(4, subzone_cd)
+
+
+class KeyedLocks:
+    """
+    One lock per key, so concurrent misses for the same tree build it only once.
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    def __call__(self, key):
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _process_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+class JobQueue(ABC):
+    """
+    Interface for report job backends.
+
+    submit() returns the new job's record straight away and runs
+    `run(job, path, progress)` later; `run` writes the result to `path` and
+    calls progress(rows_done, rows_expected) as it goes. A record is a plain
+    dict: id, owner, state (queued, running, done, failed), params, rows,
+    expected, error and timestamps.
+    """
+
+    @abstractmethod
+    def submit(self, owner, params, run):
+        """Queue `run` and return the new job's record."""
+
+    @abstractmethod
+    def get(self, job_id):
+        """The job's record, or None if unknown."""
+
+    @abstractmethod
+    def artifact_path(self, job_id):
+        """Where the job's result file is (or will be) written."""
+
+    @abstractmethod
+    def stats(self):
+        """Job counts by state."""
+
+
+class LocalJobQueue(JobQueue):
+    """
+    Runs report jobs on a bounded thread pool in this process and keeps the
+    artifacts in a local directory.
+
+    Each job's record is also written next to its artifact as JSON, so other
+    worker processes on the same host can report its status and serve its
+    results. Finished jobs older than `ttl` seconds are removed as new jobs come in.
+    """
+
+    def __init__(self, directory, workers=2, ttl=24 * 3600, logger=None):
+        self.directory = directory
+        self.ttl = ttl
+        self.logger = logger
+        os.makedirs(directory, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix='report-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def _record_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def artifact_path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.col")
+
+    def _save(self, job):
+        tmp_path = self._record_path(job['id']) + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(job, fh, default=str)
+        os.replace(tmp_path, self._record_path(job['id']))
+
+    def submit(self, owner, params, run):
+        self.cleanup()
+        job = {
+            'id': uuid.uuid4().hex,
+            'owner': owner,
+            'pid': os.getpid(),
+            'state': 'queued',
+            'params': params,
+            'rows': 0,
+            'expected': None,
+            'error': None,
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+        }
+        with self._lock:
+            self._jobs[job['id']] = job
+            self._save(job)
+        self._pool.submit(self._run, job, run)
+        if self.logger:
+            self.logger.info(f"Queued report job {job['id']} for {owner}")
+        return dict(job)
+
+    def _update(self, job, save=True, **changes):
+        with self._lock:
+            job.update(changes)
+            if save:
+                self._save(job)
+
+    def _run(self, job, run):
+        self._update(job, state='running', started_at=time.time())
+        last_saved = [0.0]
+
+        def progress(rows, expected=None):
+            # Progress is kept in memory on every call, on disk at most once a second
+            now = time.time()
+            save = now - last_saved[0] >= 1.0
+            if save:
+                last_saved[0] = now
+            self._update(job, save=save, rows=rows,
+                         expected=expected if expected is not None else job['expected'])
+
+        try:
+            run(dict(job), self.artifact_path(job['id']), progress)
+        except Exception as e:
+            self._update(job, state='failed', error=str(e), finished_at=time.time())
+            if self.logger:
+                self.logger.error(f"Report job {job['id']} failed: {e}")
+            return
+        self._update(job, state='done', finished_at=time.time())
+        if self.logger:
+            elapsed = job['finished_at'] - job['started_at']
+            self.logger.info(f"Report job {job['id']} wrote {job['rows']} rows in {elapsed:.1f}s")
+
+    def get(self, job_id):
+        """
+        The job's record, from memory or (for another worker's job) from disk; None if unknown.
+        """
+        if not job_id or not job_id.isalnum():
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        try:
+            with open(self._record_path(job_id)) as fh:
+                job = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if job['state'] in ('queued', 'running') and not _process_alive(job.get('pid')):
+            job.update(state='failed', error='Interrupted: the worker running this job has exited')
+        return job
+
+    def cleanup(self):
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            job = self.get(name[:-len('.json')])
+            if job is None or job['state'] not in ('done', 'failed'):
+                continue
+            if (job['finished_at'] or job['submitted_at']) > cutoff:
+                continue
+            for path in (self.artifact_path(job['id']), self._record_path(job['id'])):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._jobs.pop(job['id'], None)
+            removed += 1
+        return removed
+
+    def stats(self):
+        with self._lock:
+            states = [job['state'] for job in self._jobs.values()]
+        return {state: states.count(state) for state in ('queued', 'running', 'done', 'failed')}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
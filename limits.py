@@ -0,0 +1,85 @@
+import threading
+import time
+
+
+def parse_limits(spec, defaults=None):
+    """
+    "heavy=4,report=8" -> {'heavy': 4, 'report': 8}, layered over `defaults`.
+    """
+    limits = dict(defaults or {})
+    for part in (spec or '').split(','):
+        name, _, value = part.partition('=')
+        if name.strip() and value.strip().isdigit():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class ConcurrencyLimiter:
+    """
+    Caps how many requests of each route group run at once, so a burst of
+    heavy summary/chart requests can't take every worker thread away from
+    logins and dropdowns. Groups without a limit (or a limit of 0) are free.
+
+    A request over the limit is refused at once by default. A waiting request
+    would sit on a server worker thread, so queued heavy requests could still
+    starve everything else; `timeout` allows a short wait for a slot instead.
+    """
+
+    def __init__(self, limits, timeout=0.0):
+        self.limits = dict(limits)
+        self.timeout = timeout
+        self._slots = {group: threading.BoundedSemaphore(limit)
+                       for group, limit in self.limits.items() if limit > 0}
+        self._lock = threading.Lock()
+        self._active = {group: 0 for group in self._slots}
+        self._admitted = {group: 0 for group in self._slots}
+        self._rejected = {group: 0 for group in self._slots}
+        self._wait_time = {group: 0.0 for group in self._slots}
+
+    def acquire(self, group):
+        """
+        True when the request may proceed (and must later call release()).
+        """
+        slot = self._slots.get(group)
+        if slot is None:
+            return True
+        started = time.monotonic()
+        if self.timeout > 0:
+            acquired = slot.acquire(timeout=self.timeout)
+        else:
+            acquired = slot.acquire(blocking=False)
+        with self._lock:
+            self._wait_time[group] += time.monotonic() - started
+            if acquired:
+                self._active[group] += 1
+                self._admitted[group] += 1
+            else:
+                self._rejected[group] += 1
+        return acquired
+
+    def total(self):
+        """
+        Requests the limited groups can run at once, all together.
+        """
+        return sum(limit for limit in self.limits.values() if limit > 0)
+
+    def release(self, group):
+        slot = self._slots.get(group)
+        if slot is None:
+            return
+        with self._lock:
+            self._active[group] -= 1
+        slot.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                group: {
+                    'limit': self.limits[group],
+                    'active': self._active[group],
+                    'admitted': self._admitted[group],
+                    'rejected': self._rejected[group],
+                    'wait_time_total': round(self._wait_time[group], 4),
+                }
+                for group in self._slots
+            }
@@ -0,0 +1,132 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_MONTH_TABLE = re.compile(r'ngrlng_sale_\d{6}')
+_FIRST_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE)\s+([`\w.]+)', re.IGNORECASE)
+
+
+def query_name(sql):
+    """
+    Low-cardinality label for a query: its verb and first table, with the
+    month suffix of ngrlng_sale_YYYYMM tables folded away.
+    """
+    text = _MONTH_TABLE.sub('ngrlng_sale_YYYYMM', ' '.join(sql.split()))
+    verb = text.split(' ', 1)[0].upper() if text else 'QUERY'
+    match = _FIRST_TABLE.search(text)
+    return f"{verb} {match.group(1).strip('`')}" if match else verb
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus-style registry: latency histograms keyed by label
+    tuples plus callback collectors for gauges read from elsewhere (pool,
+    caches). render() produces the text exposition format.
+    """
+
+    def __init__(self, prefix='sars', buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}   # name -> (help, {label tuple: Histogram})
+        self._collectors = []
+        self._local = threading.local()
+
+    def histogram(self, name, help_text):
+        with self._lock:
+            self._histograms.setdefault(name, (help_text, {}))
+
+    def observe(self, name, labels, seconds):
+        key = tuple(labels)
+        with self._lock:
+            _, series = self._histograms[name]
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    def add_collector(self, collect):
+        """
+        `collect()` returns [(name, type, help, [(labels, value)])] at scrape time.
+        """
+        self._collectors.append(collect)
+
+    # The route label for spans recorded on this thread
+    def set_route(self, route):
+        self._local.route = route
+
+    def current_route(self):
+        return getattr(self._local, 'route', None) or 'background'
+
+    @contextmanager
+    def span(self, name):
+        """
+        Time a block and record it under the current route, e.g. span('db_connect').
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('span_duration_seconds', (('route', self.current_route()), ('span', name)),
+                         time.perf_counter() - started)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            histograms = {name: (help_text, {key: (list(h.counts), h.total, h.sum) for key, h in series.items()})
+                          for name, (help_text, series) in self._histograms.items()}
+        for name, (help_text, series) in sorted(histograms.items()):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} histogram")
+            for key, (counts, total, total_sum) in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{_labels(key + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{full}_bucket{_labels(key + (('le', '+Inf'),))} {total}")
+                lines.append(f"{full}_sum{_labels(key)} {total_sum:.6f}")
+                lines.append(f"{full}_count{_labels(key)} {total}")
+
+        for collect in self._collectors:
+            try:
+                families = collect()
+            except Exception as e:  # a broken collector must not break the scrape
+                lines.append(f"# collector error: {_escape(e)}")
+                continue
+            for name, kind, help_text, samples in families:
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full} {help_text}")
+                lines.append(f"# TYPE {full} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{full}{_labels(tuple(labels))} {value}")
+        return '\n'.join(lines) + '\n'
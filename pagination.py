@@ -0,0 +1,101 @@
+import base64
+import json
+import threading
+from collections import OrderedDict
+
+
+def filter_key(filters):
+    """
+    Normalise a report filter dict into a hashable, order-independent tuple.
+    Empty strings and None are treated the same.
+    """
+    return tuple(sorted((k, v) for k, v in filters.items() if v not in (None, '')))
+
+
+def encode_cursor(key, direction='next'):
+    """
+    Pack a seek key (area code, sale row key) into an opaque URL-safe token.
+    """
+    area, row_key = key
+    payload = json.dumps({'k': [str(area), row_key], 'd': direction}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Unpack a cursor token. Returns (key, direction) or None if the token is malformed.
+    The key must be an (area code, sale row key) pair of scalars: a string area and
+    an integer or string row key, since both are bound straight into the page query.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        key = payload['k']
+        direction = payload.get('d', 'next')
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    if not isinstance(key, list) or len(key) != 2 or direction not in ('next', 'prev'):
+        return None
+    area, row_key = key
+    if not isinstance(area, str) or isinstance(row_key, bool) or not isinstance(row_key, (int, str)):
+        return None
+    return (area, row_key), direction
+
+
+def seek_clause(direction, area_col='s.AREA', key_col='s.id'):
+    """
+    Expanded row comparison "(area, key) > (%s, %s)" that MySQL can turn into an index range.
+    """
+    op = '>' if direction == 'next' else '<'
+    return f" AND ({area_col} {op} %s OR ({area_col} = %s AND {key_col} {op} %s))"
+
+
+def seek_params(key):
+    area, row_key = key
+    return [area, area, row_key]
+
+
+class PageBoundaryIndex:
+    """
+    Sparse map of page number -> seek key of the last row on the previous page,
+    kept per (filter set, page size). Lets "jump to page N" seek from the
+    nearest known boundary instead of OFFSET-ing from the start.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def _boundaries(self, fkey, per_page):
+        ident = (fkey, per_page)
+        boundaries = self._entries.get(ident)
+        if boundaries is None:
+            boundaries = {1: None}
+            self._entries[ident] = boundaries
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(ident)
+        return boundaries
+
+    def nearest(self, fkey, per_page, page):
+        """
+        Return (known_page, key) for the closest recorded page at or before `page`.
+        """
+        with self._lock:
+            boundaries = self._boundaries(fkey, per_page)
+            known = max(p for p in boundaries if p <= page)
+            return known, boundaries[known]
+
+    def record(self, fkey, per_page, page, key):
+        if page < 2 or key is None:
+            return
+        with self._lock:
+            self._boundaries(fkey, per_page)[page] = tuple(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,210 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import Error
+
+SALES_TABLE_PREFIX = 'ngrlng_sale_'
+SALES_TABLE_PATTERN = re.compile(r'^ngrlng_sale_(\d{6})$')
+
+# Months and customer classes held by one sales table
+SCAN_MONTHS = """
+    SELECT DISTINCT Billing_Month, Cust_Cl_Cd
+    FROM {table}
+    WHERE Billing_Month IS NOT NULL AND Billing_Month != ''
+"""
+
+
+def fan_out(jobs, worker, max_workers=4):
+    """
+    Run worker(job) for every job on a bounded thread pool and return the results
+    in job order. The first exception raised by any worker is re-raised.
+    """
+    jobs = list(jobs)
+    if len(jobs) <= 1 or max_workers <= 1:
+        return [worker(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs)), thread_name_prefix='partition') as pool:
+        return list(pool.map(worker, jobs))
+
+
+class TableRegistry:
+    """
+    Discovers the monthly ngrlng_sale_YYYYMM tables and which Billing_Month
+    (and customer classes) each one holds, so queries can be routed to the
+    right table without probing the schema on every request.
+    """
+
+    def __init__(self, get_connection, default_table='ngrlng_sale_202506', max_workers=4, logger=None):
+        self.get_connection = get_connection
+        self.default_table = default_table
+        self.max_workers = max_workers
+        self.logger = logger
+        self._lock = threading.Lock()
+        # Serialises scans, so a cold start runs one discovery instead of one per request
+        self._refresh_lock = threading.RLock()
+        self._loaded = False
+        self._tables = []          # newest first
+        self._month_table = {}     # Billing_Month -> table
+        self._month_classes = {}   # Billing_Month -> set of Cust_Cl_Cd
+
+    def _scan_table(self, table):
+        conn = self.get_connection()
+        if not conn:
+            raise Error("Database connection failed")
+        try:
+            cursor = conn.cursor()
+            cursor.execute(SCAN_MONTHS.format(table=table))
+            rows = cursor.fetchall()
+            cursor.close()
+            return table, rows
+        finally:
+            conn.close()
+
+    def list_tables(self):
+        """
+        Names of the monthly sales tables currently in the schema, newest first.
+        Cheap enough to poll; doesn't touch the cached months.
+        """
+        conn = self.get_connection()
+        if not conn:
+            raise Error("Database connection failed")
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SHOW TABLES LIKE %s", (SALES_TABLE_PREFIX + '%',))
+            tables = sorted((row[0] for row in cursor.fetchall() if SALES_TABLE_PATTERN.match(row[0])),
+                            reverse=True)
+            cursor.close()
+        finally:
+            conn.close()
+        return tables
+
+    def refresh(self):
+        """
+        Re-discover the sales tables and their months, scanning tables in parallel.
+        """
+        with self._refresh_lock:
+            self._refresh()
+
+    def _refresh(self):
+        tables = self.list_tables()
+
+        month_table, month_classes = {}, {}
+        # Newest table first, so it wins if two tables claim the same month
+        for table, rows in fan_out(tables, self._scan_table, self.max_workers):
+            for billing_month, cust_cl_cd in rows:
+                billing_month = str(billing_month)
+                month_table.setdefault(billing_month, table)
+                if month_table[billing_month] == table and cust_cl_cd not in (None, ''):
+                    month_classes.setdefault(billing_month, set()).add(cust_cl_cd)
+
+        with self._lock:
+            self._tables = tables
+            self._month_table = month_table
+            self._month_classes = month_classes
+            self._loaded = True
+        if self.logger:
+            self.logger.info(f"Discovered {len(tables)} sales tables covering {len(month_table)} billing months")
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            with self._refresh_lock:
+                if not self._loaded:
+                    self._refresh()
+
+    def refresh_table(self, table):
+        """
+        Re-scan one new or reloaded table and merge its months into the registry,
+        without touching the other tables. A month claimed by several tables
+        stays with the newest one, as in refresh().
+        """
+        if not SALES_TABLE_PATTERN.match(table):
+            raise ValueError(f"Not a monthly sales table: {table!r}")
+        with self._refresh_lock:
+            if not self._loaded:
+                self._refresh()
+                return
+            _, rows = self._scan_table(table)
+            with self._lock:
+                month_table = {m: t for m, t in self._month_table.items() if t != table}
+                month_classes = {m: c for m, c in self._month_classes.items() if m in month_table}
+                for billing_month, cust_cl_cd in rows:
+                    billing_month = str(billing_month)
+                    if month_table.get(billing_month, '') < table:
+                        month_table[billing_month] = table
+                        month_classes.pop(billing_month, None)
+                    if month_table[billing_month] == table and cust_cl_cd not in (None, ''):
+                        month_classes.setdefault(billing_month, set()).add(cust_cl_cd)
+                self._tables = sorted(set(self._tables) | {table}, reverse=True)
+                self._month_table = month_table
+                self._month_classes = month_classes
+        if self.logger:
+            self.logger.info(f"Rescanned {table}: {len(rows)} month/class pairs")
+
+    def refresh_month(self, billing_month):
+        """
+        Re-scan just the table holding (or named after) `billing_month`; falls back
+        to a full refresh when no such table exists.
+        """
+        self.ensure_loaded()
+        digits = re.sub(r'\D', '', str(billing_month or ''))
+        candidates = {self._month_table.get(billing_month),
+                      SALES_TABLE_PREFIX + digits[:6] if len(digits) >= 6 else None}
+        existing = set(self.list_tables())
+        targets = sorted(table for table in candidates if table in existing)
+        if not targets:
+            self.refresh()
+        for table in targets:
+            self.refresh_table(table)
+
+    def tables(self):
+        self.ensure_loaded()
+        return list(self._tables)
+
+    def billing_months(self):
+        self.ensure_loaded()
+        return sorted(self._month_table, reverse=True)
+
+    def cust_classes(self, billing_month=None):
+        self.ensure_loaded()
+        if billing_month:
+            return sorted(self._month_classes.get(billing_month, ()))
+        return sorted(set().union(*self._month_classes.values())) if self._month_classes else []
+
+    def months_for_table(self, table):
+        """
+        Billing months routed to `table`, newest first.
+        """
+        self.ensure_loaded()
+        return sorted((month for month, owner in self._month_table.items() if owner == table), reverse=True)
+
+    def table_for(self, billing_month):
+        """
+        Sales table holding `billing_month`; falls back to a YYYYMM match on the
+        month text, then to the default table (which simply returns no rows).
+        """
+        self.ensure_loaded()
+        table = self._month_table.get(billing_month)
+        if table:
+            return table
+        digits = re.sub(r'\D', '', str(billing_month or ''))
+        candidate = SALES_TABLE_PREFIX + digits[:6]
+        if len(digits) >= 6 and candidate in self._tables:
+            return candidate
+        return self.default_table
+
+    def months_in_range(self, start, end):
+        """
+        (billing month, table) pairs for every known month between start and end inclusive.
+        """
+        low, high = sorted((start, end))
+        return [(month, self.table_for(month)) for month in sorted(self.billing_months())
+                if low <= month <= high]
+
+    def fan_out_range(self, start, end, worker):
+        """
+        Run worker(billing_month, table) for every month in the range concurrently.
+        Returns [(billing_month, result)] in month order for the caller to merge.
+        """
+        months = self.months_in_range(start, end)
+        results = fan_out(months, lambda job: worker(*job), self.max_workers)
+        return [(month, result) for (month, _), result in zip(months, results)]
@@ -0,0 +1,141 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Detailed report columns in display order: (column, table alias, header label)
+REPORT_COLUMNS = [
+    ('Account_ID', 'r', 'Account ID'),
+    ('Unit_Descr', 'r', 'Unit'),
+    ('Region_Descr', 'r', 'Region'),
+    ('Zone_Descr', 'r', 'Zone'),
+    ('SubZone_Descr', 'r', 'Sub Zone'),
+    ('Area_Descr', 'r', 'Area'),
+    ('Activity_Type', 'r', 'Activity Type'),
+    ('FA_Status', 'r', 'Status'),
+    ('Activity_Date', 'r', 'Date'),
+    ('Description', 'r', 'Description'),
+    ('Billing_Month', 's', 'Billing Month'),
+    ('Cust_Cl_Cd', 's', 'Customer Class'),
+    ('Gas_Charges', 's', 'Gas Charges'),
+    ('Meter_Rent', 's', 'Meter Rent'),
+    ('GST', 's', 'GST'),
+    ('Total_SCM', 's', 'Total SCM'),
+    ('Total_MMBTU', 's', 'Total MMBTU'),
+    ('Less_Prov_Bills', 's', 'Less Prov Bills'),
+    ('Arrears', 's', 'Arrears'),
+    ('Total_Cur_Bill', 's', 'Total Current Bill'),
+    ('Total_Net_Bill', 's', 'Total Net Bill'),
+    ('LPS_Charged', 's', 'LPS Charged'),
+    ('LPS', 's', 'LPS'),
+    ('Debit_Dr', 's', 'Debit Dr'),
+    ('Credit_Cr', 's', 'Credit Cr'),
+    ('Last_Payment', 's', 'Last Payment'),
+    ('Misc_Adj', 's', 'Misc Adj'),
+    ('Others_Adj', 's', 'Others Adj'),
+    ('Other_Amt', 's', 'Other Amt'),
+    ('Other_CM', 's', 'Other CM'),
+    ('Other_MMBTU', 's', 'Other MMBTU'),
+    ('Op_Bal', 's', 'Opening Balance'),
+    ('Cl_Bal', 's', 'Closing Balance'),
+    ('WoglamtCM', 's', 'Woglamt CM'),
+    ('WoglamtMMBTU', 's', 'Woglamt MMBTU'),
+    ('NP_Fixed_Charges', 's', 'NP Fixed Charges'),
+    ('P_Fixed_Charges', 's', 'P Fixed Charges'),
+    ('Levy_Charges', 's', 'Levy Charges'),
+    ('Levy_Adj', 's', 'Levy Adj'),
+    ('NP_Fix_Adj', 's', 'NP Fix Adj'),
+    ('P_Fix_Adj', 's', 'P Fix Adj'),
+]
+
+_IDENTITY = {'Account_ID', 'Region_Descr', 'Zone_Descr', 'Area_Descr', 'Billing_Month', 'Cust_Cl_Cd'}
+
+# Named column sets for the detailed report; each keeps REPORT_COLUMNS order
+_PROFILE_NAMES = {
+    'activity': _IDENTITY | {'Unit_Descr', 'SubZone_Descr', 'Activity_Type', 'FA_Status',
+                             'Activity_Date', 'Description'},
+    'billing': _IDENTITY | {'Gas_Charges', 'Meter_Rent', 'GST', 'Total_Cur_Bill', 'Total_Net_Bill',
+                            'LPS_Charged', 'LPS', 'Last_Payment'},
+    'consumption': _IDENTITY | {'Total_SCM', 'Total_MMBTU', 'Other_CM', 'Other_MMBTU',
+                                'WoglamtCM', 'WoglamtMMBTU'},
+    'balances': _IDENTITY | {'Op_Bal', 'Arrears', 'Debit_Dr', 'Credit_Cr', 'Misc_Adj', 'Others_Adj',
+                             'Less_Prov_Bills', 'Cl_Bal'},
+    'charges': _IDENTITY | {'NP_Fixed_Charges', 'P_Fixed_Charges', 'Levy_Charges', 'Levy_Adj',
+                            'NP_Fix_Adj', 'P_Fix_Adj', 'Other_Amt'},
+    'full': {name for name, _, _ in REPORT_COLUMNS},
+}
+COLUMN_PROFILES = {
+    profile: [col for col in REPORT_COLUMNS if col[0] in names]
+    for profile, names in _PROFILE_NAMES.items()
+}
+
+
+def resolve_columns(profile=None, names=None, default='full'):
+    """
+    (profile, columns) for a profile name or an explicit list of column names.
+    Unknown names are dropped; an explicit list that matches a profile exactly
+    is reported under that profile's name, anything else as 'custom'.
+    """
+    if names:
+        wanted = set(names)
+        columns = [col for col in REPORT_COLUMNS if col[0] in wanted]
+        if columns:
+            for name, profile_columns in COLUMN_PROFILES.items():
+                if profile_columns == columns:
+                    return name, columns
+            return 'custom', columns
+    if profile not in COLUMN_PROFILES:
+        profile = default if default in COLUMN_PROFILES else 'full'
+    return profile, COLUMN_PROFILES[profile]
+
+
+def select_list(columns):
+    """
+    SELECT list for (column, alias, label) tuples.
+    """
+    return ', '.join(f'{alias}.{name}' for name, alias, _ in columns)
+
+
+class ColumnPreferences:
+    """
+    Per-user report column choice in a local SQLite file, so it survives logout.
+    Each thread gets its own connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS column_preferences (
+                    username TEXT PRIMARY KEY,
+                    profile TEXT NOT NULL,
+                    columns TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def get(self, username):
+        """
+        (profile, [column names]) saved for `username`, or None.
+        """
+        row = self._connect().execute(
+            "SELECT profile, columns FROM column_preferences WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, username, profile, names):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO column_preferences (username, profile, columns, updated_at) "
+                         "VALUES (?, ?, ?, ?)", (username, profile, json.dumps(list(names)), time.time()))
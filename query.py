@@ -0,0 +1,40 @@
+from hierarchy import LEVELS
+
+# Columns a report may be grouped by, top to bottom; anything else is rejected
+GROUP_BY_COLUMNS = [descr_col for _, descr_col in LEVELS]
+
+# Optional session filters in a fixed order: (filter name, column; {sale} is the sales alias)
+FILTER_COLUMNS = [
+    ('cust_cl_cd', '{sale}.Cust_Cl_Cd'),
+    ('unit', 'r.Unit_Cd'),
+    ('region', 'r.Region_Cd'),
+    ('zone', 'r.Zone_Cd'),
+    ('subzone', 'r.SubZone_Cd'),
+    ('area', 'r.Area_Cd'),
+]
+
+
+def filter_where(filters, sale='s'):
+    """
+    WHERE clause and params for the report filters.
+
+    Billing month is always bound; every other filter adds a plain "col = %s"
+    only when it is set, so MySQL can use an index on it. The columns always
+    appear in the same order, so the same filter combination yields identical
+    SQL text.
+    """
+    clauses = [f"{sale}.Billing_Month = %s"]
+    params = [filters.get('billing_month')]
+    for name, column in FILTER_COLUMNS:
+        value = filters.get(name)
+        if value:
+            clauses.append(f"{column.format(sale=sale)} = %s")
+            params.append(value)
+    return "\n    WHERE " + "\n    AND ".join(clauses) + "\n", params
+
+
+def group_by_column(group_by, default='Region_Descr'):
+    """
+    `group_by` if it is a whitelisted hierarchy column, otherwise `default`.
+    """
+    return group_by if group_by in GROUP_BY_COLUMNS else default
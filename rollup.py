@@ -0,0 +1,267 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mysql.connector import Error
+
+from hierarchy import KeyedLocks
+
+ROLLUP_TABLE = 'sales_area_rollup'
+ROLLUP_STATUS_TABLE = 'sales_rollup_status'
+
+CREATE_ROLLUP_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        Billing_Month VARCHAR(32) NOT NULL,
+        Cust_Cl_Cd VARCHAR(32) NULL,
+        Unit_Cd VARCHAR(64) NULL,
+        Unit_Descr VARCHAR(255) NULL,
+        Region_Cd VARCHAR(64) NULL,
+        Region_Descr VARCHAR(255) NULL,
+        Zone_Cd VARCHAR(64) NULL,
+        Zone_Descr VARCHAR(255) NULL,
+        SubZone_Cd VARCHAR(64) NULL,
+        SubZone_Descr VARCHAR(255) NULL,
+        Area_Cd VARCHAR(64) NULL,
+        Area_Descr VARCHAR(255) NULL,
+        Record_Count BIGINT NOT NULL,
+        Gas_Charges_Sum DECIMAL(24,4) NULL,
+        Gas_Charges_Cnt BIGINT NOT NULL,
+        Total_Net_Bill_Sum DECIMAL(24,4) NULL,
+        Total_Net_Bill_Cnt BIGINT NOT NULL,
+        Meter_Rent_Sum DECIMAL(24,4) NULL,
+        GST_Sum DECIMAL(24,4) NULL,
+        Arrears_Sum DECIMAL(24,4) NULL,
+        Last_Payment_Sum DECIMAL(24,4) NULL,
+        Total_SCM_Sum DECIMAL(24,4) NULL,
+        Total_SCM_Cnt BIGINT NOT NULL,
+        Total_MMBTU_Sum DECIMAL(24,4) NULL,
+        Total_MMBTU_Cnt BIGINT NOT NULL,
+        KEY idx_rollup_month_class (Billing_Month, Cust_Cl_Cd, Area_Cd)
+    )
+"""
+
+CREATE_STATUS_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_STATUS_TABLE} (
+        Billing_Month VARCHAR(32) NOT NULL,
+        Source_Table VARCHAR(64) NOT NULL,
+        Source_Version VARCHAR(64) NULL,
+        Built_At DATETIME NOT NULL,
+        PRIMARY KEY (Billing_Month, Source_Table)
+    )
+"""
+
+# Area-level sums and non-NULL counts over the raw join, so AVG can be rebuilt exactly
+ROLLUP_SELECT = """
+    SELECT
+        s.Billing_Month, s.Cust_Cl_Cd,
+        r.Unit_Cd, r.Unit_Descr, r.Region_Cd, r.Region_Descr, r.Zone_Cd, r.Zone_Descr,
+        r.SubZone_Cd, r.SubZone_Descr, r.Area_Cd, r.Area_Descr,
+        COUNT(*),
+        SUM(s.Gas_Charges), COUNT(s.Gas_Charges),
+        SUM(s.Total_Net_Bill), COUNT(s.Total_Net_Bill),
+        SUM(s.Meter_Rent), SUM(s.GST), SUM(s.Arrears), SUM(s.Last_Payment),
+        SUM(s.Total_SCM), COUNT(s.Total_SCM),
+        SUM(s.Total_MMBTU), COUNT(s.Total_MMBTU)
+    FROM ssgc_reports r
+    INNER JOIN {table} s ON r.Area_Cd = s.AREA
+    WHERE s.Billing_Month = %s
+    GROUP BY s.Billing_Month, s.Cust_Cl_Cd,
+        r.Unit_Cd, r.Unit_Descr, r.Region_Cd, r.Region_Descr, r.Zone_Cd, r.Zone_Descr,
+        r.SubZone_Cd, r.SubZone_Descr, r.Area_Cd, r.Area_Descr
+"""
+
+# Replaces one month of the rollup (after its old rows are deleted)
+BUILD_ROLLUP = f"""
+    INSERT INTO {ROLLUP_TABLE} (
+        Billing_Month, Cust_Cl_Cd,
+        Unit_Cd, Unit_Descr, Region_Cd, Region_Descr, Zone_Cd, Zone_Descr,
+        SubZone_Cd, SubZone_Descr, Area_Cd, Area_Descr,
+        Record_Count,
+        Gas_Charges_Sum, Gas_Charges_Cnt,
+        Total_Net_Bill_Sum, Total_Net_Bill_Cnt,
+        Meter_Rent_Sum, GST_Sum, Arrears_Sum, Last_Payment_Sum,
+        Total_SCM_Sum, Total_SCM_Cnt,
+        Total_MMBTU_Sum, Total_MMBTU_Cnt
+    )""" + ROLLUP_SELECT
+
+# summary_report metrics rolled up from the area table (aliased as r)
+SUMMARY_METRICS = [
+    "COALESCE(SUM(r.Record_Count), 0) as Total_Records",
+    "COALESCE(SUM(r.Gas_Charges_Sum), 0) as Total_Gas_Charges",
+    "COALESCE(SUM(r.Gas_Charges_Sum) / NULLIF(SUM(r.Gas_Charges_Cnt), 0), 0) as Avg_Gas_Charges",
+    "COALESCE(SUM(r.Total_Net_Bill_Sum), 0) as Total_Net_Bill",
+    "COALESCE(SUM(r.Total_Net_Bill_Sum) / NULLIF(SUM(r.Total_Net_Bill_Cnt), 0), 0) as Avg_Net_Bill",
+    "COALESCE(SUM(r.Meter_Rent_Sum), 0) as Total_Meter_Rent",
+    "COALESCE(SUM(r.GST_Sum), 0) as Total_GST",
+    "COALESCE(SUM(r.Arrears_Sum), 0) as Total_Arrears",
+    "COALESCE(SUM(r.Last_Payment_Sum), 0) as Total_Last_Payments",
+    "COALESCE(SUM(r.Total_SCM_Sum), 0) as Total_SCM_Consumed",
+    "COALESCE(SUM(r.Total_SCM_Sum) / NULLIF(SUM(r.Total_SCM_Cnt), 0), 0) as Avg_SCM_Per_Account",
+    "COALESCE(SUM(r.Total_MMBTU_Sum), 0) as Total_MMBTU_Consumed",
+    "COALESCE(SUM(r.Total_MMBTU_Sum) / NULLIF(SUM(r.Total_MMBTU_Cnt), 0), 0) as Avg_MMBTU_Per_Account",
+]
+
+# chart_view metrics rolled up from the area table (aliased as r)
+CHART_METRICS = [
+    "COALESCE(SUM(r.Record_Count), 0) as Total_Records",
+    "COALESCE(SUM(r.Gas_Charges_Sum), 0) as Total_Gas_Charges",
+    "COALESCE(SUM(r.Total_Net_Bill_Sum), 0) as Total_Net_Bill",
+    "COALESCE(SUM(r.Meter_Rent_Sum), 0) as Total_Meter_Rent",
+    "COALESCE(SUM(r.GST_Sum), 0) as Total_GST",
+    "COALESCE(SUM(r.Arrears_Sum), 0) as Total_Arrears",
+    "COALESCE(SUM(r.Last_Payment_Sum), 0) as Total_Last_Payments",
+    "COALESCE(SUM(r.Total_SCM_Sum), 0) as Total_SCM_Consumed",
+    "COALESCE(SUM(r.Total_MMBTU_Sum), 0) as Total_MMBTU_Consumed",
+]
+
+
+class RollupManager:
+    """
+    Keeps the area-level rollup table in step with the monthly sales tables.
+
+    ensure() is cheap once a (month, table, version) has been seen; otherwise it
+    checks the status table and, if the rollup is missing or was built from an
+    older load, rebuilds that month under a MySQL named lock so only one worker
+    does the work. With build=False it only checks, so request threads never
+    wait on a build; build_async() runs the build on a background thread.
+    Any failure (e.g. a read-only DB user) returns False and the caller falls
+    back to the raw join.
+    """
+
+    def __init__(self, enabled=True, logger=None):
+        self.enabled = enabled
+        self.logger = logger
+        self._ready = set()
+        self._forced = set()
+        self._tables_created = False
+        self._guard = threading.Lock()
+        self._locks = KeyedLocks()
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rollup-build')
+
+    def _log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def invalidate(self, billing_month=None):
+        """
+        Force the next ensure() for this month (or every month) to rebuild.
+        """
+        with self._guard:
+            stale = {key for key in self._ready if billing_month is None or key[0] == billing_month}
+            self._ready -= stale
+            self._forced |= {key[0] for key in stale}
+            if billing_month:
+                self._forced.add(billing_month)
+
+    def ensure(self, conn, billing_month, source_table, source_version, build=True):
+        if not self.enabled or not billing_month:
+            return False
+        version = str(source_version)
+        key = (billing_month, source_table, version)
+        if key in self._ready:
+            return True
+        if not build:
+            return self._check(conn, key)
+
+        with self._locks((billing_month, source_table)):
+            if key in self._ready:
+                return True
+            cursor = conn.cursor(dictionary=True)
+            try:
+                if not self._tables_created:
+                    cursor.execute(CREATE_ROLLUP_TABLE)
+                    cursor.execute(CREATE_STATUS_TABLE)
+                    self._tables_created = True
+
+                if billing_month not in self._forced and self._is_current(cursor, billing_month, source_table, version):
+                    self._mark_ready(key)
+                    return True
+
+                lock_name = f"rollup:{source_table}:{billing_month}"
+                cursor.execute("SELECT GET_LOCK(%s, 120) AS locked", (lock_name,))
+                if not cursor.fetchone()['locked']:
+                    return False
+                try:
+                    # Another worker may have finished the build while we waited
+                    if billing_month in self._forced or not self._is_current(cursor, billing_month, source_table, version):
+                        self._build(conn, cursor, billing_month, source_table, version)
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s) AS released", (lock_name,))
+                    cursor.fetchone()
+
+                self._mark_ready(key)
+                return True
+            except Error as e:
+                self._log('error', f"Rollup unavailable for {billing_month}: {e}")
+                return False
+            finally:
+                cursor.close()
+
+    def _check(self, conn, key):
+        """
+        True if the status table says the rollup for `key` is current; never builds or waits.
+        """
+        if key[0] in self._forced:
+            return False
+        cursor = conn.cursor(dictionary=True)
+        try:
+            if self._is_current(cursor, *key):
+                self._mark_ready(key)
+                return True
+            return False
+        except Error:
+            # Status table not created yet, or not readable: use the raw join
+            return False
+        finally:
+            cursor.close()
+
+    def build_async(self, get_connection, billing_month, source_table, source_version):
+        """
+        Build (or rebuild) a month's rollup on the background thread, at most once at a time.
+        """
+        key = (billing_month, source_table, str(source_version))
+        with self._guard:
+            if not self.enabled or not billing_month or key in self._pending or key in self._ready:
+                return
+            self._pending.add(key)
+        self._executor.submit(self._build_in_background, get_connection, key)
+
+    def _build_in_background(self, get_connection, key):
+        conn = None
+        try:
+            conn = get_connection()
+            if conn:
+                self.ensure(conn, *key)
+        except Error as e:
+            self._log('error', f"Background rollup build failed for {key[0]}: {e}")
+        finally:
+            if conn:
+                conn.close()
+            with self._guard:
+                self._pending.discard(key)
+
+    def _mark_ready(self, key):
+        with self._guard:
+            self._ready.add(key)
+            self._forced.discard(key[0])
+
+    def _is_current(self, cursor, billing_month, source_table, version):
+        cursor.execute(
+            f"SELECT Source_Version FROM {ROLLUP_STATUS_TABLE} WHERE Billing_Month = %s AND Source_Table = %s",
+            (billing_month, source_table))
+        row = cursor.fetchone()
+        return bool(row) and row['Source_Version'] == version
+
+    def _build(self, conn, cursor, billing_month, source_table, version):
+        self._log('info', f"Building {ROLLUP_TABLE} for {billing_month} from {source_table}")
+        try:
+            cursor.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE Billing_Month = %s", (billing_month,))
+            cursor.execute(BUILD_ROLLUP.format(table=source_table), (billing_month,))
+            cursor.execute(f"""
+                REPLACE INTO {ROLLUP_STATUS_TABLE} (Billing_Month, Source_Table, Source_Version, Built_At)
+                VALUES (%s, %s, %s, NOW())
+            """, (billing_month, source_table, version))
+            conn.commit()
+        except Error:
+            conn.rollback()
+            raise
@@ -0,0 +1,146 @@
+from mysql.connector import Error
+
+REPORTS_TABLE = 'ssgc_reports'
+
+# Report queries join ssgc_reports r ON r.Area_Cd = s.AREA, filter the sales table on
+# Billing_Month / Cust_Cl_Cd and ssgc_reports on the hierarchy codes, and the keyset
+# pager orders by (AREA, row key).
+
+
+def sales_indexes(row_key='id'):
+    """
+    (index name, columns) for a monthly ngrlng_sale_YYYYMM table.
+    """
+    return [
+        ('idx_sale_month_class_area', ['Billing_Month', 'Cust_Cl_Cd', 'AREA']),
+        ('idx_sale_month_area_key', ['Billing_Month', 'AREA', row_key]),
+    ]
+
+
+REPORTS_INDEXES = [
+    ('idx_reports_area_hierarchy', ['Area_Cd', 'Unit_Cd', 'Region_Cd', 'Zone_Cd', 'SubZone_Cd']),
+    ('idx_reports_account', ['Account_ID']),
+]
+
+
+def existing_indexes(cursor, table):
+    """
+    {index name: [columns in order]} for `table` in the current schema.
+    """
+    cursor.execute("""
+        SELECT INDEX_NAME, COLUMN_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+    """, (table,))
+    indexes = {}
+    for row in cursor.fetchall():
+        name, column = (row['INDEX_NAME'], row['COLUMN_NAME']) if isinstance(row, dict) else row
+        indexes.setdefault(name, []).append(column)
+    return indexes
+
+
+def _covered(columns, indexes):
+    """
+    True when an existing index already starts with `columns`.
+    """
+    return any(existing[:len(columns)] == columns for existing in indexes.values())
+
+
+def ensure_indexes(conn, sales_tables, row_key='id', dry_run=False, logger=None):
+    """
+    Create any missing report indexes. Returns [(table, index, columns, action)]
+    where action is 'exists', 'created', 'would create' or 'failed: ...'.
+    """
+    plan = [(REPORTS_TABLE, name, columns) for name, columns in REPORTS_INDEXES]
+    for table in sales_tables:
+        plan += [(table, name, columns) for name, columns in sales_indexes(row_key)]
+
+    results = []
+    cursor = conn.cursor()
+    try:
+        known = {}
+        for table, name, columns in plan:
+            if table not in known:
+                known[table] = existing_indexes(cursor, table)
+            if name in known[table] or _covered(columns, known[table]):
+                results.append((table, name, columns, 'exists'))
+                continue
+            if dry_run:
+                results.append((table, name, columns, 'would create'))
+                continue
+            try:
+                cursor.execute(f"ALTER TABLE {table} ADD INDEX {name} ({', '.join(columns)}), "
+                               f"ALGORITHM=INPLACE, LOCK=NONE")
+                known[table][name] = list(columns)
+                results.append((table, name, columns, 'created'))
+                if logger:
+                    logger.info(f"Created index {name} on {table} ({', '.join(columns)})")
+            except Error as e:
+                results.append((table, name, columns, f'failed: {e}'))
+                if logger:
+                    logger.error(f"Could not create index {name} on {table}: {e}")
+    finally:
+        cursor.close()
+    return results
+
+
+def explain_query(cursor, sql, params=()):
+    """
+    Problems in the plan of one query: full table scans, filesorts and temporary tables.
+    Returns (plan rows, [issue strings]).
+    """
+    cursor.execute("EXPLAIN " + sql, tuple(params))
+    plan = cursor.fetchall()
+    issues = []
+    for row in plan:
+        table = row.get('table')
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL':
+            issues.append(f"full scan of {table} (~{row.get('rows')} rows"
+                          f"{', no usable index' if not row.get('possible_keys') else ''})")
+        if 'Using filesort' in extra:
+            issues.append(f"filesort on {table}")
+        if 'Using temporary' in extra:
+            issues.append(f"temporary table for {table}")
+    return plan, issues
+
+
+def advise(conn, queries):
+    """
+    EXPLAIN every (name, sql, params) and collect [(name, issues or error)].
+    """
+    report = []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for name, sql, params in queries:
+            try:
+                _, issues = explain_query(cursor, sql, params)
+                report.append((name, issues))
+            except Error as e:
+                report.append((name, [f"EXPLAIN failed: {e}"]))
+    finally:
+        cursor.close()
+    return report
+
+
+def column_types(cursor, table_columns):
+    """
+    (DATA_TYPE, NUMERIC_PRECISION, NUMERIC_SCALE) for each (table, column) pair,
+    in order, from information_schema; None for a column that isn't found.
+    """
+    tables = sorted({table for table, _ in table_columns})
+    if not tables:
+        return []
+    cursor.execute(f"""
+        SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, NUMERIC_PRECISION, NUMERIC_SCALE
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({', '.join(['%s'] * len(tables))})
+    """, tuple(tables))
+    found = {}
+    for row in cursor.fetchall():
+        if isinstance(row, dict):
+            row = (row['TABLE_NAME'], row['COLUMN_NAME'], row['DATA_TYPE'],
+                   row['NUMERIC_PRECISION'], row['NUMERIC_SCALE'])
+        found[(row[0], row[1].lower())] = tuple(row[2:])
+    return [found.get((table, column.lower())) for table, column in table_columns]
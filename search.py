@@ -0,0 +1,115 @@
+import re
+from bisect import bisect_left
+
+from hierarchy import LEVELS, hierarchy_query
+
+TOKEN_PATTERN = re.compile(r'[0-9A-Za-z]+')
+
+ACCOUNTS_QUERY = """
+    SELECT DISTINCT r.Account_ID
+    FROM ssgc_reports r
+    WHERE r.Account_ID IS NOT NULL
+    AND r.Area_Cd IN (
+        SELECT s.AREA FROM {table} s
+        WHERE s.Billing_Month = %s
+    )
+"""
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).upper()) if text is not None else []
+
+
+def _prefix_range(keys, prefix):
+    """
+    Slice bounds of the sorted `keys` that start with `prefix`.
+    """
+    start = bisect_left(keys, prefix)
+    end = bisect_left(keys, prefix + '￿', start)
+    return start, end
+
+
+class SearchIndex:
+    """
+    In-memory inverted index for one billing month, used to turn a free-text
+    search into sargable predicates on the report join.
+
+    Hierarchy descriptions and codes map to the Area_Cd values they cover,
+    account IDs are kept in a sorted list for prefix lookups, and customer
+    classes come from the table registry. Every search word is matched by
+    prefix against all three; words are ANDed together.
+    """
+
+    def __init__(self, hierarchy_rows, accounts, cust_classes, max_in=1000):
+        self.max_in = max_in
+        area_tokens = {}
+        for row in hierarchy_rows:
+            area = row['Area_Cd']
+            if area is None or area == '':
+                continue
+            for code_col, descr_col in LEVELS:
+                for token in tokenize(row[descr_col]) + tokenize(row[code_col]):
+                    area_tokens.setdefault(token, set()).add(area)
+        self._area_tokens = area_tokens
+        self._area_keys = sorted(area_tokens)
+
+        accounts = {str(account).upper(): account for account in accounts if account not in (None, '')}
+        self._account_keys = sorted(accounts)
+        self._accounts = accounts
+
+        self._classes = {str(cls).upper(): cls for cls in cust_classes}
+
+    def __len__(self):
+        return len(self._area_keys) + len(self._account_keys) + len(self._classes)
+
+    def _areas(self, word):
+        start, end = _prefix_range(self._area_keys, word)
+        areas = set()
+        for token in self._area_keys[start:end]:
+            areas |= self._area_tokens[token]
+        return areas
+
+    def where(self, query):
+        """
+        (sql, params) to append to the report WHERE clause for `query`.
+        Returns ('', []) for an empty query and an always-false clause when
+        some word matches nothing.
+        """
+        clauses, params = [], []
+        for word in tokenize(query):
+            parts, part_params = [], []
+
+            areas = sorted(self._areas(word), key=str)
+            if areas:
+                parts.append(f"r.Area_Cd IN ({', '.join(['%s'] * len(areas))})")
+                part_params += areas
+
+            start, end = _prefix_range(self._account_keys, word)
+            if end - start > self.max_in:
+                # Too many accounts for an IN list; a prefix LIKE still uses the index
+                escaped = word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                parts.append("r.Account_ID LIKE %s")
+                part_params.append(escaped + '%')
+            elif end > start:
+                accounts = [self._accounts[key] for key in self._account_keys[start:end]]
+                parts.append(f"r.Account_ID IN ({', '.join(['%s'] * len(accounts))})")
+                part_params += accounts
+
+            classes = [cls for key, cls in self._classes.items() if key.startswith(word)]
+            if classes:
+                parts.append(f"s.Cust_Cl_Cd IN ({', '.join(['%s'] * len(classes))})")
+                part_params += classes
+
+            if not parts:
+                return "\n  AND 1 = 0", []
+            clauses.append(f"\n  AND ({' OR '.join(parts)})")
+            params += part_params
+        return ''.join(clauses), params
+
+
+def build_search_index(cursor, table, billing_month, cust_classes, max_in=1000):
+    cursor.execute(hierarchy_query(table=table), (billing_month,))
+    hierarchy_rows = cursor.fetchall()
+    cursor.execute(ACCOUNTS_QUERY.format(table=table), (billing_month,))
+    accounts = [row['Account_ID'] for row in cursor.fetchall()]
+    return SearchIndex(hierarchy_rows, accounts, cust_classes, max_in=max_in)
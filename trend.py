@@ -0,0 +1,139 @@
+from decimal import Decimal
+
+from query import GROUP_BY_COLUMNS
+from rollup import ROLLUP_TABLE
+
+# Geographic grouping levels, top to bottom
+GROUP_LEVELS = GROUP_BY_COLUMNS
+
+# Additive partial aggregates returned by each monthly query
+PARTIAL_FIELDS = [
+    'Record_Count',
+    'Gas_Charges_Sum', 'Gas_Charges_Cnt',
+    'Total_Net_Bill_Sum', 'Total_Net_Bill_Cnt',
+    'Meter_Rent_Sum', 'GST_Sum', 'Arrears_Sum', 'Last_Payment_Sum',
+    'Total_SCM_Sum', 'Total_SCM_Cnt',
+    'Total_MMBTU_Sum', 'Total_MMBTU_Cnt',
+]
+
+RAW_PARTIALS = [
+    "COUNT(*) as Record_Count",
+    "SUM(s.Gas_Charges) as Gas_Charges_Sum", "COUNT(s.Gas_Charges) as Gas_Charges_Cnt",
+    "SUM(s.Total_Net_Bill) as Total_Net_Bill_Sum", "COUNT(s.Total_Net_Bill) as Total_Net_Bill_Cnt",
+    "SUM(s.Meter_Rent) as Meter_Rent_Sum", "SUM(s.GST) as GST_Sum",
+    "SUM(s.Arrears) as Arrears_Sum", "SUM(s.Last_Payment) as Last_Payment_Sum",
+    "SUM(s.Total_SCM) as Total_SCM_Sum", "COUNT(s.Total_SCM) as Total_SCM_Cnt",
+    "SUM(s.Total_MMBTU) as Total_MMBTU_Sum", "COUNT(s.Total_MMBTU) as Total_MMBTU_Cnt",
+]
+
+ROLLUP_PARTIALS = [f"SUM(r.{field}) as {field}" for field in PARTIAL_FIELDS]
+
+# Summary metric -> (sum field, count field); a count field means the metric is an average
+TREND_METRICS = {
+    'Total_Records': ('Record_Count', None),
+    'Total_Gas_Charges': ('Gas_Charges_Sum', None),
+    'Avg_Gas_Charges': ('Gas_Charges_Sum', 'Gas_Charges_Cnt'),
+    'Total_Net_Bill': ('Total_Net_Bill_Sum', None),
+    'Avg_Net_Bill': ('Total_Net_Bill_Sum', 'Total_Net_Bill_Cnt'),
+    'Total_Meter_Rent': ('Meter_Rent_Sum', None),
+    'Total_GST': ('GST_Sum', None),
+    'Total_Arrears': ('Arrears_Sum', None),
+    'Total_Last_Payments': ('Last_Payment_Sum', None),
+    'Total_SCM_Consumed': ('Total_SCM_Sum', None),
+    'Avg_SCM_Per_Account': ('Total_SCM_Sum', 'Total_SCM_Cnt'),
+    'Total_MMBTU_Consumed': ('Total_MMBTU_Sum', None),
+    'Avg_MMBTU_Per_Account': ('Total_MMBTU_Sum', 'Total_MMBTU_Cnt'),
+}
+
+
+def group_columns(group_by):
+    """
+    Hierarchy columns down to and including `group_by` (defaults to Region).
+    """
+    if group_by not in GROUP_LEVELS:
+        group_by = 'Region_Descr'
+    return GROUP_LEVELS[:GROUP_LEVELS.index(group_by) + 1]
+
+
+def partial_query(table, group_cols, where, use_rollup=False):
+    """
+    Per-month grouped partial sums/counts, from the rollup or the raw join.
+    """
+    cols = ', '.join(f"r.{col}" for col in group_cols)
+    if use_rollup:
+        metrics, source = ROLLUP_PARTIALS, f"{ROLLUP_TABLE} r"
+    else:
+        metrics, source = RAW_PARTIALS, f"ssgc_reports r\n    INNER JOIN {table} s ON r.Area_Cd = s.AREA"
+    return f"""
+    SELECT {cols}, {', '.join(metrics)}
+    FROM {source}
+    {where}
+    GROUP BY {cols}
+    """
+
+
+def _add(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a + b
+
+
+def merge_partials(into, row):
+    for field in PARTIAL_FIELDS:
+        into[field] = _add(into.get(field), row.get(field))
+    return into
+
+
+def finalize(partial):
+    """
+    Summary metrics from merged partials; averages are SUM / COUNT, never an average of averages.
+    """
+    result = {}
+    for metric, (sum_field, cnt_field) in TREND_METRICS.items():
+        total = partial.get(sum_field) or 0
+        if cnt_field:
+            count = partial.get(cnt_field) or 0
+            total = Decimal(total) / count if count else 0
+        result[metric] = float(total)
+    return result
+
+
+def build_matrix(month_rows, group_cols):
+    """
+    Turn [(billing_month, rows)] into a month-by-group matrix.
+
+    Returns months, groups (label + hierarchy path), and for every metric a
+    list of per-group rows holding one value per month (None where a group had
+    no sales that month), plus whole-range totals per group.
+    """
+    months = [month for month, _ in month_rows]
+    cells = {}    # group path -> {month: partial}
+    totals = {}   # group path -> partial over the whole range
+
+    for month, rows in month_rows:
+        for row in rows:
+            path = tuple(row[col] for col in group_cols)
+            merge_partials(cells.setdefault(path, {}).setdefault(month, {}), row)
+            merge_partials(totals.setdefault(path, {}), row)
+
+    paths = sorted(cells, key=lambda path: tuple('' if v is None else str(v) for v in path))
+    finalized = {path: {month: finalize(p) for month, p in by_month.items()} for path, by_month in cells.items()}
+    finalized_totals = {path: finalize(totals[path]) for path in paths}
+
+    return {
+        'months': months,
+        'group_by': group_cols[-1],
+        'groups': [{'label': path[-1] if path[-1] is not None else 'N/A',
+                    'path': list(path)} for path in paths],
+        'metrics': {
+            metric: [[finalized[path][month][metric] if month in finalized[path] else None for month in months]
+                     for path in paths]
+            for metric in TREND_METRICS
+        },
+        'totals': {
+            metric: [finalized_totals[path][metric] for path in paths]
+            for metric in TREND_METRICS
+        },
+    }
@@ -0,0 +1,77 @@
+from mysql.connector import Error
+
+LOAD_VERSION_TABLE = 'sales_load_versions'
+
+# One row per sales table, bumped by /refresh_month (or by the loader itself with
+# the statement in BUMP_LOAD_VERSION) whenever the table is reloaded
+CREATE_LOAD_VERSION_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {LOAD_VERSION_TABLE} (
+        Table_Name VARCHAR(64) NOT NULL PRIMARY KEY,
+        Load_Version BIGINT NOT NULL,
+        Loaded_At DATETIME NOT NULL
+    )
+"""
+
+BUMP_LOAD_VERSION = f"""
+    INSERT INTO {LOAD_VERSION_TABLE} (Table_Name, Load_Version, Loaded_At)
+    VALUES (%s, 1, NOW())
+    ON DUPLICATE KEY UPDATE Load_Version = Load_Version + 1, Loaded_At = NOW()
+"""
+
+_NO_SUCH_TABLE = 1146
+_UNKNOWN_VARIABLE = 1193
+
+
+def _row_value(row, key):
+    if row is None:
+        return None
+    return row[key] if isinstance(row, dict) else row[0]
+
+
+def read_load_version(cursor, table):
+    """
+    Load version of a sales table as a string, the same in every worker:
+    the announced load counter plus the table's UPDATE_TIME.
+
+    The counter is what reliably moves on a reload. UPDATE_TIME is only a
+    backstop for loads nobody announced: MySQL 8 caches it for
+    information_schema_stats_expiry seconds (a day by default), so the
+    session setting is turned off here, and InnoDB forgets it after a restart.
+    """
+    try:
+        cursor.execute(f"SELECT Load_Version FROM {LOAD_VERSION_TABLE} WHERE Table_Name = %s", (table,))
+        load_version = _row_value(cursor.fetchone(), 'Load_Version') or 0
+    except Error as e:
+        if e.errno != _NO_SUCH_TABLE:
+            raise
+        load_version = 0
+
+    try:
+        cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+    except Error as e:
+        # MySQL 5.7 and MariaDB have no statistics cache to turn off
+        if e.errno != _UNKNOWN_VARIABLE:
+            raise
+    cursor.execute("""
+        SELECT UPDATE_TIME FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    update_time = _row_value(cursor.fetchone(), 'UPDATE_TIME')
+    return f"{load_version}:{update_time}"
+
+
+def bump_load_version(conn, tables):
+    """
+    Record a reload of `tables`, so every worker's next version check sees it.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(CREATE_LOAD_VERSION_TABLE)
+        for table in tables:
+            cursor.execute(BUMP_LOAD_VERSION, (table,))
+        conn.commit()
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Warmer:
+    """
+    Pre-computes the common views of a billing month in the background.
+
+    `jobs_for(billing_month)` returns [(name, callable)]; each callable fills
+    one of the app's caches. Jobs from every scheduled month share one small
+    thread pool, so at most `max_workers` warm-up queries run at once next to
+    user traffic. Progress per month is kept for status().
+    """
+
+    def __init__(self, jobs_for, max_workers=2, logger=None):
+        self.jobs_for = jobs_for
+        self.logger = logger
+        self._pool = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix='warmup')
+        self._lock = threading.Lock()
+        self._runs = {}     # billing month -> progress dict
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def schedule(self, billing_month):
+        """
+        Queue the warm-up jobs for a month unless a run for it is still in progress.
+        Returns the month's progress dict.
+        """
+        with self._lock:
+            run = self._runs.get(billing_month)
+            if run is not None and run['state'] in ('queued', 'running'):
+                return dict(run)
+            run = self._runs[billing_month] = {
+                'state': 'queued',
+                'total': 0,
+                'done': 0,
+                'failed': 0,
+                'current': [],
+                'errors': [],
+                'queued_at': time.time(),
+                'finished_at': None,
+            }
+
+        # Building the job list may itself hit the database, so it runs outside the lock
+        try:
+            jobs = self.jobs_for(billing_month)
+        except Exception as e:
+            jobs = []
+            error = f"jobs: {e}"
+        else:
+            error = None
+        with self._lock:
+            if error:
+                run['errors'].append(error)
+            run['total'] = len(jobs)
+            if not jobs:
+                run['state'] = 'failed' if run['errors'] else 'done'
+                run['finished_at'] = time.time()
+        for name, job in jobs:
+            self._pool.submit(self._run, billing_month, run, name, job)
+        if self.logger:
+            self.logger.info(f"Scheduled {len(jobs)} warm-up jobs for billing month {billing_month}")
+        return dict(run)
+
+    def _run(self, billing_month, run, name, job):
+        with self._lock:
+            run['state'] = 'running'
+            run['current'].append(name)
+        started = time.perf_counter()
+        error = None
+        try:
+            job()
+        except Exception as e:
+            error = e
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            run['current'].remove(name)
+            if error is None:
+                run['done'] += 1
+            else:
+                run['failed'] += 1
+                run['errors'].append(f"{name}: {error}")
+            finished = run['done'] + run['failed'] == run['total']
+            if finished:
+                run['state'] = 'failed' if run['failed'] else 'done'
+                run['finished_at'] = time.time()
+        if self.logger:
+            if error is None:
+                self.logger.info(f"Warm-up {billing_month} {name} took {elapsed:.2f}s")
+            else:
+                self.logger.error(f"Warm-up {billing_month} {name} failed: {error}")
+            if finished:
+                self.logger.info(f"Warm-up for billing month {billing_month} finished: "
+                                 f"{run['done']}/{run['total']} jobs ok")
+
+    def status(self):
+        with self._lock:
+            return {month: dict(run, current=list(run['current']), errors=list(run['errors']))
+                    for month, run in self._runs.items()}
+
+    def watch(self, list_tables, on_new_tables, interval=300.0):
+        """
+        Poll list_tables() every `interval` seconds on a daemon thread and call
+        on_new_tables(new_tables) when tables appear that weren't there before.
+        The first poll only records what already exists.
+        """
+        def loop():
+            known = None
+            while not self._stop.is_set():
+                try:
+                    tables = set(list_tables())
+                    if known is not None and tables - known:
+                        on_new_tables(sorted(tables - known))
+                    known = tables
+                except Exception as e:
+                    if self.logger:
+                        self.logger.error(f"Sales table watch failed: {e}")
+                self._stop.wait(interval)
+
+        self._watcher = threading.Thread(target=loop, name='warmup-watch', daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def shutdown(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False)